@@ -0,0 +1,302 @@
+"""Benchmarks for tweets.
+
+Run the benchmark suite on synthetic corpora of 10^3 to 10^5 tweets, writing
+one JSON object per result to stdout:
+
+    python bench_tweets.py suite --sizes 1000 10000 100000
+
+Results include the git revision, so files of results from different
+revisions can be compared. Run the micro benchmarks with:
+
+    python bench_tweets.py micro
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, TextIO
+import tweets
+
+SOURCES = ['Twitter for Android', 'Twitter for iPhone', 'Twitter Web Client',
+           'Hootsuite Inc.', 'TweetDeck']
+LOCATIONS = ['Unknown Location', 'Toronto Ontario', 'Mississauga Ontario',
+             'Scarborough Ontario']
+FIRST_DATE = datetime.datetime(2018, 1, 1)
+
+
+def time_call(func: callable, *args: object) -> float:
+    """Return the wall time in seconds of the fastest of three calls of func
+    with args.
+    """
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+# Synthetic corpora
+
+def zipf_index(generator: random.Random, size: int) -> int:
+    """Return a number from 0 to size - 1, where the chance of n is roughly
+    proportional to 1 / (n + 1), like word frequencies in natural text.
+    """
+    return int(size ** generator.random()) - 1
+
+
+def generate_text(generator: random.Random, num_users: int,
+                  hashtag_density: float, mention_density: float,
+                  vocab_size: int) -> str:
+    """Return the text of one synthetic tweet. Each token is a hashtag with
+    probability hashtag_density, a mention with probability mention_density
+    and otherwise a word, with an occasional URL, punctuation, line break or
+    line ending in a colon.
+    """
+    tokens = []
+    if generator.random() < 0.2:
+        tokens.append('RT @user{}:'.format(generator.randrange(num_users)))
+    for _ in range(generator.randint(5, 25)):
+        kind = generator.random()
+        if kind < hashtag_density:
+            tokens.append('#Tag{}'.format(zipf_index(generator, vocab_size)))
+        elif kind < hashtag_density + mention_density:
+            tokens.append('@user{}'.format(generator.randrange(num_users)))
+        else:
+            word = 'w{}'.format(zipf_index(generator, vocab_size))
+            tokens.append(word + generator.choice(['', '', '', ',', '!', '?']))
+    if generator.random() < 0.3:
+        tokens.append('https://t.co/{:x}'.format(generator.getrandbits(40)))
+    text = ' '.join(tokens)
+    if generator.random() < 0.1:
+        text = text.replace(' ', ':\n', 1)
+    return text
+
+
+def generate_corpus(file: TextIO, num_users: int, tweets_per_user: int,
+                    hashtag_density: float = 0.05,
+                    mention_density: float = 0.05,
+                    vocab_size: int = 10000, seed: int = 0) -> int:
+    """Write a synthetic tweet file to file in the format read by
+    tweets.read_tweets, and return the number of tweets written.
+
+    Each user's tweets are written newest first, as in tweets_big.txt.
+    """
+    generator = random.Random(seed)
+    for user in range(num_users):
+        file.write('User{}:\n'.format(user))
+        seconds = sorted((generator.randrange(365 * 24 * 3600)
+                          for _ in range(tweets_per_user)), reverse=True)
+        for second in seconds:
+            date = FIRST_DATE + datetime.timedelta(seconds=second)
+            file.write('{},{},{},{},{}\n{}\n<<<EOT\n'.format(
+                date.strftime('%Y%m%d%H%M%S'), generator.choice(LOCATIONS),
+                generator.choice(SOURCES),
+                int(generator.expovariate(0.2)),
+                int(generator.expovariate(0.5)),
+                generate_text(generator, num_users, hashtag_density,
+                              mention_density, vocab_size)))
+    return num_users * tweets_per_user
+
+
+# Benchmark suite
+
+def revision() -> str:
+    """Return the git revision of the working tree, or '' if unknown."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_suite(num_tweets: int, tweets_per_user: int, hashtag_density: float,
+              mention_density: float, vocab_size: int,
+              seed: int) -> List[Dict[str, object]]:
+    """Return the timings of the tweets entry points on a synthetic corpus
+    of about num_tweets tweets.
+    """
+    num_users = max(1, num_tweets // tweets_per_user)
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            num_tweets = generate_corpus(
+                file, num_users, tweets_per_user, hashtag_density,
+                mention_density, vocab_size, seed)
+        size = os.path.getsize(path)
+
+        def read() -> Dict[str, List[tuple]]:
+            with open(path) as file:
+                return tweets.read_tweets(file)
+
+        timings = {}
+        start = time.perf_counter()
+        users_to_tweets = read()
+        timings['read_tweets'] = time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+    texts = [tweet[tweets.TWEET_TEXT_INDEX] for user in users_to_tweets
+             for tweet in users_to_tweets[user]]
+    words_to_counts = {}
+    start = time.perf_counter()
+    for text in texts:
+        tweets.count_words(text, words_to_counts)
+    timings['count_words'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tweets.common_words(words_to_counts, 100)
+    timings['common_words'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tweets.most_popular(users_to_tweets, 20180301000000, 20180901000000)
+    timings['most_popular'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tweets.detect_author(users_to_tweets, texts[len(texts) // 2])
+    timings['detect_author'] = time.perf_counter() - start
+
+    common = {'tweets': num_tweets, 'users': num_users, 'bytes': size,
+              'hashtag_density': hashtag_density,
+              'mention_density': mention_density, 'vocab_size': vocab_size,
+              'seed': seed, 'revision': revision(),
+              'python': platform.python_version()}
+    return [dict(common, benchmark=name, seconds=seconds)
+            for name, seconds in timings.items()]
+
+
+# Micro benchmarks
+
+def bench_get_usernames() -> None:
+    """Print how get_usernames scales on usernames and on tweet text lines
+    ending in ':\\n'. For a linear pass the time per line stays flat.
+    """
+    for n in [25000, 50000, 100000, 200000, 400000]:
+        usernames = ['user:\n'] * n
+        text = ['UofT:\n', '1,Home,Web,2,3\n'] + ['lol:\n'] * n + ['<<<EOT\n']
+        for name, lines in [('usernames', usernames), ('colon text', text)]:
+            elapsed = time_call(tweets.get_usernames, lines)
+            print('get_usernames {:>10} n={:>7} {:8.4f}s {:6.1f}ns/line'.format(
+                name, n, elapsed, elapsed / len(lines) * 1e9))
+
+
+def bench_tokenize() -> None:
+    """Print the time per tweet of tokenizing every tweet in tweets_big.txt
+    once, compared with extracting mentions, hashtags and word counts with
+    separate calls.
+    """
+    with open('tweets_big.txt') as file:
+        texts = [tweet[tweets.TWEET_TEXT_INDEX]
+                 for user_tweets in tweets.read_tweets(file).values()
+                 for tweet in user_tweets] * 200
+
+    def separate() -> None:
+        words_to_counts = {}
+        for text in texts:
+            tweets.extract_mentions(text)
+            tweets.extract_hashtags(text)
+            tweets.count_words(text, words_to_counts)
+
+    def single_pass() -> None:
+        for text in texts:
+            tweets.tokenize(text)
+
+    for name, func in [('separate calls', separate),
+                       ('tokenize', single_pass)]:
+        elapsed = time_call(func)
+        print('{:>14} {:8.2f}us/tweet'.format(name,
+                                              elapsed / len(texts) * 1e6))
+
+
+def bench_count_words() -> None:
+    """Print how count_words scales with the number of mentions, hashtags
+    and URLs in a text. For a linear pass the time per token stays flat.
+    """
+    for n in [10000, 20000, 40000, 80000]:
+        text = '@a #b http://c word ' * n
+        elapsed = time_call(tweets.count_words, text, {})
+        print('count_words n={:>6} {:8.4f}s {:6.1f}ns/token'.format(
+            n, elapsed, elapsed / (4 * n) * 1e9))
+
+
+def bench_common_words() -> None:
+    """Print the time of common_words on vocabularies of up to a million
+    words with Zipf-like counts.
+    """
+    for size in [10000, 100000, 1000000]:
+        words_to_counts = {'w{}'.format(i): size // (i + 1)
+                           for i in range(size)}
+        for num in [10, 1000]:
+            elapsed = time_call(
+                lambda: tweets.common_words(dict(words_to_counts), num))
+            print('common_words V={:>7} num={:>4} {:8.4f}s'.format(
+                size, num, elapsed))
+
+
+def bench_read_tweets_memory(num_tweets: int = 200000) -> None:
+    """Print the memory allocated for the result of read_tweets per million
+    tweets, for a synthetic file of num_tweets tweets.
+    """
+    file = io.StringIO()
+    num_tweets = generate_corpus(file, num_tweets // 50, 50)
+    contents = file.getvalue()
+
+    tracemalloc.start()
+    result = tweets.read_tweets(io.StringIO(contents))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    print('read_tweets memory {:8.1f}MB per million tweets'.format(
+        size / num_tweets * 1e6 / 2 ** 20))
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmarks named in argv."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command')
+    suite = commands.add_parser('suite', help='time the main entry points')
+    suite.add_argument('--sizes', type=int, nargs='+',
+                       default=[1000, 10000, 100000],
+                       help='approximate numbers of tweets, up to 10^7')
+    suite.add_argument('--tweets-per-user', type=int, default=100)
+    suite.add_argument('--hashtag-density', type=float, default=0.05)
+    suite.add_argument('--mention-density', type=float, default=0.05)
+    suite.add_argument('--vocab-size', type=int, default=10000)
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--output', type=argparse.FileType('a'),
+                       default=sys.stdout, help='file to append results to')
+    commands.add_parser('micro', help='run the micro benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.command == 'micro':
+        bench_get_usernames()
+        bench_tokenize()
+        bench_count_words()
+        bench_common_words()
+        bench_read_tweets_memory()
+        return
+    if args.command is None:
+        args = parser.parse_args(['suite'])
+    for size in args.sizes:
+        for result in run_suite(size, args.tweets_per_user,
+                                args.hashtag_density, args.mention_density,
+                                args.vocab_size, args.seed):
+            args.output.write(json.dumps(result) + '\n')
+            args.output.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Tester for the function append_tweets in tweets.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import tweets
+
+class TestAppendTweets(unittest.TestCase):
+    """Tests for the function append_tweets in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt and make a temporary directory.
+        """
+        with open('tweets_big.txt', 'rb') as file:
+            self.contents = file.read()
+        with open('tweets_big.txt') as file:
+            self.expected = tweets.read_tweets(file)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tweets.txt')
+
+
+    def tearDown(self):
+        """Remove the temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+
+    def check_state(self, state):
+        """Check state and its indexes match tweets_big.txt.
+        """
+        self.assertEqual(state.users_to_tweets, self.expected)
+        expected_popularity = tweets.PopularityIndex.from_dict(self.expected)
+        self.assertEqual(state.popularity.users_to_sums,
+                         expected_popularity.users_to_sums)
+        expected_words = {}
+        tweets.count_words_many(
+            [tweet[tweets.TWEET_TEXT_INDEX] for user in self.expected
+             for tweet in self.expected[user]], expected_words)
+        self.assertEqual(state.words.counts, expected_words)
+        for text in ['#RemembranceDay', '#UofT', '#StartAI #AI']:
+            self.assertEqual(tweets.detect_author(state.hashtags, text),
+                             tweets.detect_author(self.expected, text))
+
+
+    def test_growing_file(self):
+        """Test appending the file in pieces that end in the middle of lines
+        and tweets.
+        """
+        state = tweets.TweetState(self.path)
+        added = 0
+        with open(self.path, 'wb') as file:
+            for start in range(0, len(self.contents), 997):
+                file.write(self.contents[start:start + 997])
+                file.flush()
+                added += tweets.append_tweets(state)
+                self.assertLessEqual(state.offset, start + 997)
+        self.assertEqual(added, 58)
+        self.assertEqual(state.offset, len(self.contents))
+        self.assertEqual(tweets.append_tweets(state), 0)
+        self.check_state(state)
+
+
+    def test_records(self):
+        """Test appending (username, tweet) pairs.
+        """
+        state = tweets.TweetState()
+        with open('tweets_big.txt') as file:
+            added = tweets.append_tweets(state, tweets.iter_tweets(file))
+        self.assertEqual(added, 58)
+        # iter_tweets doesn't yield users with no tweets
+        state.add_user('uoft')
+        self.check_state(state)
+
+
+
+    def test_duplicates(self):
+        """Test tweets appended again are dropped before they are counted.
+        """
+        state = tweets.TweetState()
+        for _ in range(2):
+            with open('tweets_big.txt') as file:
+                added = tweets.append_tweets(state, tweets.iter_tweets(file))
+        self.assertEqual(added, 0)
+        self.assertEqual(state.merger.duplicates, 58)
+        state.add_user('uoft')
+        self.check_state(state)
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
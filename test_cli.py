@@ -0,0 +1,154 @@
+"""Tester for the command line interface of tweets.
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import tweets
+
+class TestCli(unittest.TestCase):
+    """Tests for the function main in tweets.
+    """
+
+    def run_main(self, argv):
+        """Return the exit status of main(argv) and the lines it wrote.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = tweets.main(argv)
+        return (status, output.getvalue().splitlines())
+
+
+    def test_parse(self):
+        """Test parse writes every tweet of tweets_big.txt as JSON.
+        """
+        with open('tweets_big.txt') as file:
+            expected = [dict(zip(tweets.CLI_FIELDS['parse'],
+                                 (user,) + tuple(tweet[1:]) + (tweet[0],)))
+                        for user, tweet in tweets.iter_tweets(file)]
+        status, lines = self.run_main(['parse', 'tweets_big.txt'])
+        actual = [json.loads(line) for line in lines]
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(status, 0)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_hashtags_csv(self):
+        """Test hashtags writes a CSV row for each hashtag of each tweet.
+        """
+        with open('tweets_small.txt') as file:
+            expected = ['user,date,hashtag'] + [
+                '{},{},{}'.format(user, tweet.date, hashtag)
+                for user, tweet in tweets.iter_tweets(file)
+                for hashtag in tweets.extract_hashtags(tweet.text)]
+        status, actual = self.run_main(['--format', 'csv', 'hashtags',
+                                        'tweets_small.txt'])
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_top_words(self):
+        """Test top-words writes the words kept by common_words.
+        """
+        words_to_counts = {}
+        with open('tweets_big.txt') as file:
+            for user, tweet in tweets.iter_tweets(file):
+                tweets.count_words(tweet.text, words_to_counts)
+        tweets.common_words(words_to_counts, 5)
+        expected = words_to_counts
+        status, lines = self.run_main(['top-words', '-n', '5',
+                                       'tweets_big.txt'])
+        actual = {}
+        for line in lines:
+            record = json.loads(line)
+            actual[record['word']] = record['count']
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_bad_top_words_options(self):
+        """Test top-words rejects -n and --capacity that are not positive.
+        """
+        for options in [['-n', '0'], ['--capacity', '0'],
+                        ['--capacity', '-1']]:
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                with self.assertRaises(SystemExit) as context:
+                    tweets.main(['top-words'] + options + ['tweets_big.txt'])
+            self.assertEqual(context.exception.code, 2)
+            self.assertIn(options[0], errors.getvalue())
+
+
+    def test_popular_and_author(self):
+        """Test popular and author agree with most_popular and
+        detect_author, with and without a cache.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'tweets.txt')
+            shutil.copy('tweets_big.txt', path)
+            with open(path) as file:
+                users_to_tweets = tweets.read_tweets(file)
+            text = '#RemembranceDay #Naryn'
+            expected = [
+                {'from': 20181101000000, 'to': 20181110000000,
+                 'user': tweets.most_popular(users_to_tweets, 20181101000000,
+                                             20181110000000)},
+                {'text': text,
+                 'author': tweets.detect_author(users_to_tweets, text)}]
+            for cache in [[], ['--cache'], []]:
+                actual = []
+                for argv in [['popular', '--from', '20181101000000', '--to',
+                              '20181110000000'], ['author', '--text', text]]:
+                    status, lines = self.run_main(argv + cache + [path])
+                    actual.extend(json.loads(line) for line in lines)
+                msg = "Expected {}, but returned {}".format(expected, actual)
+                self.assertEqual(actual, expected, msg)
+            self.assertTrue(os.path.exists(path + tweets.CACHE_SUFFIX))
+        finally:
+            shutil.rmtree(directory)
+
+
+
+    def test_concatenated_files(self):
+        """Test the streaming commands leave out the tweets of
+        tweets_small.txt that are duplicates of tweets in tweets_big.txt.
+        """
+        contents = ''
+        for name in ['tweets_big.txt', 'tweets_small.txt']:
+            with open(name) as file:
+                contents += file.read()
+        users_to_tweets = tweets.read_tweets(io.StringIO(contents))
+        texts = [tweet.text for user in users_to_tweets
+                 for tweet in users_to_tweets[user]]
+        files = ['tweets_big.txt', 'tweets_small.txt']
+
+        status, lines = self.run_main(['parse'] + files)
+        expected = sorted((user,) + tuple(tweet[1:]) + (tweet[0],)
+                          for user in users_to_tweets
+                          for tweet in users_to_tweets[user])
+        actual = sorted(tuple(json.loads(line).values()) for line in lines)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+        expected = {}
+        tweets.count_words_many(texts, expected)
+        tweets.common_words(expected, 5)
+        status, lines = self.run_main(['top-words', '-n', '5'] + files)
+        actual = {}
+        for line in lines:
+            record = json.loads(line)
+            actual[record['word']] = record['count']
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+        expected = sum(len(tweets.extract_mentions(text)) for text in texts)
+        status, lines = self.run_main(['mentions'] + files)
+        msg = "Expected {}, but returned {}".format(expected, len(lines))
+        self.assertEqual(len(lines), expected, msg)
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
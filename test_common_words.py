@@ -179,6 +179,46 @@ class TestCommonWords(unittest.TestCase):
                "but it was\n {}").format(exp_arg1, arg1)
         self.assertEqual(arg1, exp_arg1, msg)          
 
+
+
+    def test_top_words_unchanged(self):
+        """Test top_words returns the word-count pairs common_words keeps
+        without changing the dictionary.
+        """
+
+        arg1 = {'hel': 5, 'he': 5, 'wag1': 4, 'yo': 3, '23': 3}
+        arg2 = 4
+        exp_arg1 = {'hel': 5, 'he': 5, 'wag1': 4, 'yo': 3, '23': 3}
+        act_return = tweets.top_words(arg1, arg2)
+        exp_return = [('hel', 5), ('he', 5), ('wag1', 4)]
+
+        msg = "Expected {}, but returned {}".format(exp_return, act_return)
+        self.assertEqual(act_return, exp_return, msg)
+
+        msg = ("Expected dictionary to be {}\n, " +
+               "but it was\n {}").format(exp_arg1, arg1)
+        self.assertEqual(arg1, exp_arg1, msg)
+
+
+    def test_large_vocabulary(self):
+        """Test a dictionary of a million words with a tie for the num-th
+        spot.
+        """
+
+        arg1 = {str(i): i // 2 for i in range(1000000)}
+        arg2 = 5
+        exp_arg1 = {'999996': 499998, '999997': 499998, 
+                    '999998': 499999, '999999': 499999}
+        act_return = tweets.common_words(arg1, arg2)
+        exp_return = None
+
+        msg = "Expected {}, but returned {}".format(exp_return, act_return)
+        self.assertEqual(act_return, exp_return, msg)
+
+        msg = ("Expected dictionary to be {}\n, " +
+               "but it was\n {}").format(exp_arg1, arg1)
+        self.assertEqual(arg1, exp_arg1, msg)
+
         
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -0,0 +1,61 @@
+"""Tester for the functions count_words and count_words_many in tweets.
+"""
+
+import unittest
+import tweets
+
+class TestCountWords(unittest.TestCase):
+    """Tests for the functions count_words and count_words_many in tweets.
+    """
+
+    def test_empty(self):
+        """Test an empty text leaves the counts unchanged.
+        """
+        arg = {'hello': 2}
+        tweets.count_words('', arg)
+        expected = {'hello': 2}
+        msg = "Expected {}, but it was {}".format(expected, arg)
+        self.assertEqual(arg, expected, msg)
+
+
+    def test_skipped_tokens(self):
+        """Test mentions, hashtags, URLs and words with no alphanumeric
+        characters are not counted, and new words are added in order.
+        """
+        arg = {'yo': 1}
+        tweets.count_words('@yo #yo http://yo.ca Yo! ?! ba_na-na YO', arg)
+        expected = [('yo', 3), ('banana', 1)]
+        msg = "Expected {}, but it was {}".format(expected, arg)
+        self.assertEqual(list(arg.items()), expected, msg)
+
+
+    def test_many_mentions(self):
+        """Test a text with hundreds of thousands of mentions and hashtags.
+        """
+        arg = {}
+        tweets.count_words('@a #b http://c word ' * 200000, arg)
+        expected = {'word': 200000}
+        msg = "Expected {}, but it was {}".format(expected, arg)
+        self.assertEqual(arg, expected, msg)
+
+
+    def test_count_words_many(self):
+        """Test counting all tweets in tweets_big.txt at once gives the same
+        counts as counting them one at a time.
+        """
+        with open('tweets_big.txt') as file:
+            users_to_tweets = tweets.read_tweets(file)
+        texts = [tweet[tweets.TWEET_TEXT_INDEX]
+                 for user in users_to_tweets
+                 for tweet in users_to_tweets[user]]
+        expected = {'the': 1}
+        for text in texts:
+            tweets.count_words(text, expected)
+        actual = {'the': 1}
+        tweets.count_words_many(iter(texts), actual)
+        msg = "Expected {}, but it was {}".format(expected, actual)
+        self.assertEqual(list(actual.items()), list(expected.items()), msg)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,81 @@
+"""Tester for the function detect_author and the class HashtagIndex in tweets.
+"""
+
+import unittest
+import tweets
+
+class TestDetectAuthor(unittest.TestCase):
+    """Tests for the function detect_author and the class HashtagIndex in
+    tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt.
+        """
+        with open('tweets_big.txt') as file:
+            self.users_to_tweets = tweets.read_tweets(file)
+        self.index = tweets.HashtagIndex.from_dict(self.users_to_tweets)
+
+
+    def check(self, text, expected):
+        """Check detect_author returns expected for text, both from the tweets
+        and from the index.
+        """
+        for users in [self.users_to_tweets, self.index]:
+            actual = tweets.detect_author(users, text)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_no_hashtags(self):
+        """Test a tweet without hashtags.
+        """
+        self.check('no hashtags here', 'unknown')
+
+
+    def test_single_user(self):
+        """Test hashtags all used by only one user.
+        """
+        self.check('#RemembranceDay #Naryn #naryn', 'uoftcompsci')
+
+
+    def test_shared_hashtag(self):
+        """Test a hashtag used by more than one user.
+        """
+        self.assertGreater(len(self.index.users_with('uoft')), 1)
+        self.check('#UofT', 'unknown')
+
+
+    def test_unused_hashtag(self):
+        """Test a hashtag no user used.
+        """
+        self.check('#RemembranceDay #neverused', 'unknown')
+
+
+    def test_add_text(self):
+        """Test the index is updated by new tweets.
+        """
+        self.index.add_text('utm', '#RemembranceDay')
+        actual = tweets.detect_author(self.index, '#RemembranceDay')
+        self.assertEqual(actual, 'unknown')
+
+
+    def test_detect_authors(self):
+        """Test detect_authors gives the same results as detect_author, with
+        and without worker processes.
+        """
+        texts = ['#RemembranceDay', '#UofT', '', '#neverused', '#Naryn #AI',
+                 '#Naryn #UofT'] * 50
+        expected = [tweets.detect_author(self.users_to_tweets, text)
+                    for text in texts]
+        actual = list(tweets.detect_authors(self.users_to_tweets, texts))
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        actual = list(tweets.detect_authors(self.index, iter(texts),
+                                            workers=2, chunk_size=7))
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
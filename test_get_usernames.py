@@ -0,0 +1,54 @@
+"""Tester for the function get_usernames in tweets.
+"""
+
+import unittest
+import tweets
+
+class TestGetUsernames(unittest.TestCase):
+    """Tests for the function get_usernames in tweets.
+    """
+
+    def test_empty(self):
+        """Test an empty list of lines.
+        """
+        actual = tweets.get_usernames([])
+        expected = []
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_consecutive_usernames(self):
+        """Test usernames following each other and a tweet end.
+        """
+        arg = ['UofT:\n', 'UTM:\n', '1,Home,Web,2,3\n', 'lol:\n', '<<<EOT\n',
+               'UTSC:\n']
+        actual = tweets.get_usernames(arg)
+        expected = [0, 1, 5]
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_many_colon_text_lines(self):
+        """Test a tweet with hundreds of thousands of text lines ending in a
+        colon, none of which are usernames.
+        """
+        arg = (['UofT:\n', '1,Home,Web,2,3\n'] + ['lol:\n'] * 300000 +
+               ['<<<EOT\n', 'UTM:\n'])
+        actual = tweets.get_usernames(arg)
+        expected = [0, 300003]
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_many_consecutive_usernames(self):
+        """Test hundreds of thousands of consecutive usernames, each of which
+        must be checked against the line before it.
+        """
+        arg = ['user:\n'] * 300000 + ['1,Home,Web,2,3\n', 'bro chill:\n']
+        actual = tweets.get_usernames(arg)
+        expected = list(range(300000))
+        self.assertEqual(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,111 @@
+"""Tester for the class MentionGraph in tweets.
+"""
+
+import io
+import unittest
+import bench_tweets
+import tweets
+
+class TestMentionGraph(unittest.TestCase):
+    """Tests for the class MentionGraph in tweets.
+    """
+
+    def setUp(self):
+        """Make a synthetic corpus with many mentions, and the mentions
+        found by rescanning every tweet.
+        """
+        file = io.StringIO()
+        bench_tweets.generate_corpus(file, 30, 20, mention_density=0.2,
+                                     seed=2018)
+        self.users_to_tweets = tweets.read_tweets(io.StringIO(file.getvalue()))
+        with open('tweets_big.txt') as file:
+            self.users_to_tweets.update(tweets.read_tweets(file))
+        self.graph = tweets.MentionGraph.from_dict(self.users_to_tweets)
+        # (author, mentioned account, date) of every mention
+        self.all_mentions = [
+            (user, mention, tweet.date) for user in self.users_to_tweets
+            for tweet in self.users_to_tweets[user]
+            for mention in tweets.extract_mentions(tweet.text)]
+
+
+    def counts(self, start=0, end=99999999999999):
+        """Return the number of mentions of each edge from start to end.
+        """
+        edges = {}
+        for user, mention, date in self.all_mentions:
+            if start <= date <= end:
+                edges[(user, mention)] = edges.get((user, mention), 0) + 1
+        return edges
+
+
+    def test_edges_and_degrees(self):
+        """Test the edges and degrees of every account.
+        """
+        edges = self.counts()
+        for name in self.graph.names:
+            expected = {target: weight for (source, target), weight
+                        in edges.items() if source == name}
+            actual = self.graph.mentions(name)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+            self.assertEqual(self.graph.out_degree(name), len(expected))
+            self.assertEqual(self.graph.out_degree(name, weighted=True),
+                             sum(expected.values()))
+
+            expected = {source: weight for (source, target), weight
+                        in edges.items() if target == name}
+            actual = self.graph.mentioned_by(name)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+            self.assertEqual(self.graph.in_degree(name), len(expected))
+            self.assertEqual(self.graph.in_degree(name, weighted=True),
+                             sum(expected.values()))
+
+            expected = sorted(
+                source for (source, target) in edges
+                if target == name and source != name
+                and (name, source) in edges)
+            actual = sorted(self.graph.mutual_mentions(name))
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+        self.assertEqual(self.graph.mentions('nobody'), {})
+        self.assertEqual(self.graph.in_degree('nobody'), 0)
+
+
+    def test_top_mentioned(self):
+        """Test the most mentioned accounts in date ranges.
+        """
+        for start, end in [(0, 99999999999999),
+                           (20180301000000, 20180601000000),
+                           (20181101000000, 20181110000000)]:
+            counts = {}
+            for (source, target), weight in self.counts(start, end).items():
+                counts[target] = counts.get(target, 0) + weight
+            expected = sorted(counts.items(),
+                              key=lambda pair: (-pair[1], pair[0]))[:10]
+            actual = self.graph.top_mentioned(10, start, end)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_ego_network(self):
+        """Test the ego network of every account in a date range.
+        """
+        start, end = 20180301000000, 20180901000000
+        edges = self.counts(start, end)
+        for name in self.graph.names:
+            members = {name}
+            for source, target in edges:
+                if source == name:
+                    members.add(target)
+                if target == name:
+                    members.add(source)
+            expected = {edge: weight for edge, weight in edges.items()
+                        if edge[0] in members and edge[1] in members}
+            actual = self.graph.ego_network(name, start, end)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
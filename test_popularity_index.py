@@ -0,0 +1,51 @@
+"""Tester for the class PopularityIndex in tweets.
+"""
+
+import unittest
+import tweets
+
+class TestPopularityIndex(unittest.TestCase):
+    """Tests for the class PopularityIndex in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt.
+        """
+        with open('tweets_big.txt') as file:
+            self.users_to_tweets = tweets.read_tweets(file)
+        self.dates = sorted(set(tweet[tweets.TWEET_DATE_INDEX]
+                                for user in self.users_to_tweets
+                                for tweet in self.users_to_tweets[user]))
+        self.date_ranges = [(0, 1), (0, 30000000000000)]
+        for date in self.dates:
+            self.date_ranges += [(date, date), (date - 1, date + 1000000),
+                                 (date + 1, self.dates[-1])]
+
+
+    def test_most_popular(self):
+        """Test most_popular gives the same result for an index.
+        """
+        index = tweets.PopularityIndex.from_dict(self.users_to_tweets)
+        for start, end in self.date_ranges:
+            expected = tweets.most_popular(self.users_to_tweets, start, end)
+            actual = tweets.most_popular(index, start, end)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_append(self):
+        """Test appending tweets newest first gives the same index as building
+        it at once.
+        """
+        expected = tweets.PopularityIndex.from_dict(self.users_to_tweets)
+        index = tweets.PopularityIndex()
+        index.extend(self.users_to_tweets)
+        self.assertEqual(index.users_to_dates, expected.users_to_dates)
+        self.assertEqual(index.users_to_sums, expected.users_to_sums)
+        for start, end in self.date_ranges:
+            self.assertEqual(index.popularity(start, end),
+                             expected.popularity(start, end))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,105 @@
+"""Tester for the function popularity_leaderboard in tweets.
+"""
+
+import random
+import unittest
+from unittest import mock
+import tweets
+
+class TestPopularityLeaderboard(unittest.TestCase):
+    """Tests for the function popularity_leaderboard in tweets.
+    """
+
+    def setUp(self):
+        """Make random users whose popularities often tie.
+        """
+        generator = random.Random(2018)
+        self.cases = []
+        for _ in range(300):
+            users_to_tweets = {}
+            for user in range(generator.randint(0, 12)):
+                users_to_tweets['user{}'.format(user)] = [
+                    ('hi', generator.randint(100, 120), 'pop',
+                     generator.randint(0, 3), generator.randint(0, 3))
+                    for _ in range(generator.randint(0, 4))]
+            start = generator.randint(95, 120)
+            end = generator.randint(start, 125)
+            self.cases.append((users_to_tweets, start, end,
+                               generator.randint(1, 8)))
+
+
+    def expected_leaderboard(self, users_to_tweets, start, end, k):
+        """Return the leaderboard found by sorting every user.
+        """
+        totals = {user: sum(tweet[3] + tweet[4] for tweet in tweets_list
+                            if start <= tweet[1] <= end)
+                  for user, tweets_list in users_to_tweets.items()}
+        ranked = sorted(totals, key=lambda user: (-totals[user], user))
+        if len(ranked) > k:
+            cutoff = totals[ranked[k - 1]]
+            ranked = [user for user in ranked if totals[user] >= cutoff]
+        entries = []
+        for i in range(len(ranked)):
+            total = totals[ranked[i]]
+            if entries and entries[-1][1] == total:
+                entries[-1][2].append(ranked[i])
+            else:
+                entries.append((i + 1, total, [ranked[i]]))
+        return entries
+
+
+    def test_random(self):
+        """Test random users against sorting every user.
+        """
+        for case in self.cases:
+            expected = self.expected_leaderboard(*case)
+            actual = [tuple(entry)
+                      for entry in tweets.popularity_leaderboard(*case)]
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_agrees_with_most_popular(self):
+        """Test the first entry agrees with most_popular.
+        """
+        for users_to_tweets, start, end, k in self.cases:
+            expected = tweets.most_popular(users_to_tweets, start, end)
+            entries = tweets.popularity_leaderboard(users_to_tweets, start,
+                                                    end, k)
+            if entries and len(entries[0].usernames) == 1:
+                actual = entries[0].usernames[0]
+            else:
+                actual = 'tie'
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_shared_popularity(self):
+        """Test most_popular and popularity_leaderboard both sum popularity
+        with user_popularity.
+        """
+        users_to_popularity = {'a': 3, 'b': 5}
+        with mock.patch.object(tweets, 'user_popularity',
+                               return_value=users_to_popularity) as summed:
+            self.assertEqual(tweets.most_popular({}, 0, 1), 'b')
+            entries = tweets.popularity_leaderboard({}, 0, 1, 1)
+        self.assertEqual(entries[0].usernames, ['b'])
+        self.assertEqual(summed.call_count, 2)
+
+
+    def test_store(self):
+        """Test a TweetStore gives the same leaderboard as its dictionary.
+        """
+        with open('tweets_big.txt') as file:
+            users_to_tweets = tweets.read_tweets(file)
+        store = tweets.TweetStore.from_dict(users_to_tweets)
+        expected = tweets.popularity_leaderboard(
+            users_to_tweets, 20181101000000, 20181110000000, 3)
+        actual = tweets.popularity_leaderboard(
+            store, 20181101000000, 20181110000000, 3)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,163 @@
+"""Tester for the function profile in tweets.
+"""
+
+import asyncio
+import json
+import threading
+import unittest
+import tweets
+
+class TestProfile(unittest.TestCase):
+    """Tests for the function profile in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt while profiling.
+        """
+        with open('tweets_big.txt') as file:
+            self.expected = tweets.read_tweets(file)
+        with tweets.profile(trace_memory=True) as self.profile:
+            with open('tweets_big.txt') as file:
+                self.actual = tweets.read_tweets(file)
+
+
+    def test_same_result(self):
+        """Test profiling does not change the result of read_tweets.
+        """
+        msg = "Expected {}, but returned {}".format(self.expected,
+                                                    self.actual)
+        self.assertEqual(self.actual, self.expected, msg)
+
+
+    def test_stages(self):
+        """Test the records counted by each stage of read_tweets.
+        """
+        stages = self.profile.stages
+        num_tweets = sum(len(user_tweets)
+                         for user_tweets in self.expected.values())
+        with open('tweets_big.txt') as file:
+            lines = file.readlines()
+        expected = {'read_tweets': num_tweets, 'read': len(lines),
+                    'find_usernames': len(self.expected),
+                    'build_tweets': num_tweets}
+        actual = {stage: stages[stage]['records'] for stage in expected}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+        expected = sum(len(line.encode('utf-8')) for line in lines)
+        actual = (stages['read']['bytes'], stages['read_tweets']['bytes'])
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, (expected, expected), msg)
+
+
+    def test_batch_records(self):
+        """Test batch stages count the records of the whole batch, and
+        read_tweets_parallel records the stages of parsing its chunks.
+        """
+        num_tweets = sum(len(user_tweets)
+                         for user_tweets in self.expected.values())
+        texts = [tweet.text for user_tweets in self.expected.values()
+                 for tweet in user_tweets]
+        for workers in [1, 2]:
+            with tweets.profile() as stats:
+                tweets.read_tweets_parallel(['tweets_big.txt'], workers,
+                                            chunk_size=2000)
+                tweets.count_words_many(iter(texts), {})
+                tweets.most_popular_many(self.expected, [(0, 1), (1, 2)])
+            stages = stats.stages
+            expected = {'read_tweets_parallel': num_tweets,
+                        'parse_chunk': num_tweets, 'build_tweets': num_tweets,
+                        'count_words_many': len(texts),
+                        'most_popular_many': 2}
+            actual = {stage: stages[stage]['records'] for stage in expected}
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+            self.assertGreater(stages['parse_chunk']['calls'], 1)
+            self.assertEqual(stages['read_tweets_parallel']['bytes'],
+                             self.profile.stages['read']['bytes'])
+
+
+    def test_peak_memory(self):
+        """Test peak memory is recorded when traced.
+        """
+        actual = self.profile.stages['read_tweets']['peak_memory']
+        msg = "Expected a positive peak, but returned {}".format(actual)
+        self.assertTrue(actual > 0, msg)
+
+
+    def test_disabled(self):
+        """Test nothing is recorded outside the with block.
+        """
+        tweets.count_words('word word', {})
+        expected = None
+        actual = self.profile.stages.get('count_words')
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_callback_and_json(self):
+        """Test the callback gets the Profile, exported as JSON.
+        """
+        results = []
+        with tweets.profile(callback=lambda stats:
+                            results.append(stats.to_json())):
+            tweets.count_words('word #tag word', {})
+        expected = {'calls': 1, 'records': 1, 'bytes': 14}
+        stages = json.loads(results[0])['stages']
+        actual = {key: stages['count_words'][key] for key in expected}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_threads(self):
+        """Test a profile in one thread does not record work of another
+        thread running at the same time.
+        """
+        barrier = threading.Barrier(2)
+        profiles = {}
+
+        def work(name, text):
+            with tweets.profile() as profiles[name]:
+                barrier.wait()
+                tweets.count_words(text, {})
+                barrier.wait()
+
+        threads = [threading.Thread(target=work, args=('a', 'a b')),
+                   threading.Thread(target=work, args=('b', 'a b c d'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = {'a': 3, 'b': 7}
+        actual = {name: profiles[name].stages['count_words']['bytes']
+                  for name in profiles}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_tasks(self):
+        """Test a profile in one asyncio task does not record work of another
+        task, or leave the profile active after the task.
+        """
+        async def work(text):
+            with tweets.profile() as stats:
+                await asyncio.sleep(0)
+                tweets.count_words(text, {})
+                await asyncio.sleep(0)
+            return stats
+
+        async def main():
+            return await asyncio.gather(work('a b'), work('a b c d'),
+                                        asyncio.sleep(0))
+
+        profiles = asyncio.run(main())[:2]
+        expected = [{'calls': 1, 'bytes': 3}, {'calls': 1, 'bytes': 7}]
+        actual = [{key: stats.stages['count_words'][key] for key in
+                   ('calls', 'bytes')} for stats in profiles]
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertIsNone(tweets._profile.get())
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
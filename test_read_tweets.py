@@ -0,0 +1,213 @@
+"""Tester for the functions read_tweets and iter_tweets in tweets.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+import tweets
+
+class TestReadTweets(unittest.TestCase):
+    """Tests for the functions read_tweets and iter_tweets in tweets.
+    """
+
+    def test_empty(self):
+        """Test an empty file.
+        """
+        actual = tweets.read_tweets(io.StringIO(''))
+        expected = {}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_colon_in_text(self):
+        """Test tweet text lines ending in a colon are not usernames.
+        """
+        arg = ('UofT:\n1,Home,Web,2,3\nbro chill:\nlol:\n<<<EOT\n' +
+               'UTM:\nUTSC:\n4,Home,Web,5,6\nHi\n<<<EOT\n')
+        actual = tweets.read_tweets(io.StringIO(arg))
+        expected = {'uoft': [('bro chill:\nlol:', 1, 'Web', 2, 3)],
+                    'utm': [],
+                    'utsc': [('Hi', 4, 'Web', 5, 6)]}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_big_file(self):
+        """Test the number of tweets read for each user in tweets_big.txt.
+        """
+        with open('tweets_big.txt') as file:
+            actual = tweets.read_tweets(file)
+        expected = {'uoftcompsci': 22, 'uoftartsci': 19, 'uoft': 0,
+                    'utsc': 5, 'utm': 8, 'uoftnews': 4}
+        actual_counts = {user: len(actual[user]) for user in actual}
+        msg = "Expected {}, but returned {}".format(expected, actual_counts)
+        self.assertEqual(actual_counts, expected, msg)
+
+        expected_tweet = (
+            'Congratulations to all our fall graduates!  ' +
+            'https://t.co/iRXYwYUAKa', 20181106202405, 'Twitter for Android',
+            6, 1)
+        msg = "Expected {}, but returned {}".format(expected_tweet,
+                                                    actual['uoftcompsci'][4])
+        self.assertEqual(actual['uoftcompsci'][4], expected_tweet, msg)
+
+
+    def test_tweet_records(self):
+        """Test tweets are Tweet records that share their source strings.
+        """
+        with open('tweets_big.txt') as file:
+            actual = tweets.read_tweets(file)
+        first, second = actual['uoftcompsci'][0], actual['uoftcompsci'][1]
+        self.assertIsInstance(first, tweets.Tweet)
+        self.assertEqual(first.date, first[tweets.TWEET_DATE_INDEX])
+        self.assertEqual(first.source, 'Twitter for Android')
+        self.assertIs(first.source, second.source)
+
+
+    def test_iter_tweets_matches(self):
+        """Test iter_tweets yields the same tweets as read_tweets in order.
+        """
+        with open('tweets_big.txt') as file:
+            expected = tweets.read_tweets(file)
+        actual = {}
+        with open('tweets_big.txt') as file:
+            for username, tweet in tweets.iter_tweets(file):
+                if username not in actual:
+                    actual[username] = []
+                actual[username].append(tweet)
+        # iter_tweets does not yield users with no tweets
+        expected.pop('uoft')
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_parallel_chunks(self):
+        """Test read_tweets_parallel gives the same result as read_tweets
+        however tweets_big.txt is split into chunks.
+        """
+        with open('tweets_big.txt') as file:
+            expected = tweets.read_tweets(file)
+        for chunk_size in [1, 100, 2000, 1000000]:
+            for workers in [1, 2]:
+                actual = tweets.read_tweets_parallel(
+                    ['tweets_big.txt'], workers=workers, chunk_size=chunk_size)
+                msg = "Expected {}, but returned {}".format(expected, actual)
+                self.assertEqual(actual, expected, msg)
+
+
+    def test_parallel_files(self):
+        """Test read_tweets_parallel joins each user's tweets from several
+        files in order.
+        """
+        with open('tweets_big.txt') as file:
+            big = tweets.read_tweets(file)
+        with open('tweets_small.txt') as file:
+            small = tweets.read_tweets(file)
+        actual = tweets.read_tweets_parallel(
+            ['tweets_small.txt', 'tweets_big.txt'], workers=2, chunk_size=500)
+        self.assertEqual(list(actual), ['uoftcompsci', 'uoftartsci', 'uoft',
+                                        'utsc', 'utm', 'uoftnews'])
+        # the tweets of big that are also in small are dropped
+        expected = small['uoftcompsci'] + [
+            tweet for tweet in big['uoftcompsci']
+            if tweet not in small['uoftcompsci']]
+        msg = "Expected {}, but returned {}".format(expected,
+                                                    actual['uoftcompsci'])
+        self.assertEqual(actual['uoftcompsci'], expected, msg)
+        self.assertEqual(actual['utm'], big['utm'])
+
+
+    def test_concatenated_files(self):
+        """Test tweets_small.txt appended to tweets_big.txt merges the
+        repeated UofTCompSci section and drops its duplicate tweets.
+        """
+        with open('tweets_big.txt') as file:
+            big = file.read()
+        with open('tweets_small.txt') as file:
+            small = file.read()
+        big_tweets = tweets.read_tweets(io.StringIO(big))
+        small_tweets = tweets.read_tweets(io.StringIO(small))
+        expected = dict(big_tweets)
+        expected['uoftcompsci'] = big_tweets['uoftcompsci'] + [
+            tweet for tweet in small_tweets['uoftcompsci']
+            if tweet not in big_tweets['uoftcompsci']]
+
+        merger = tweets.TweetMerger()
+        actual = tweets.read_tweets(io.StringIO(big + small), merger)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        expected_report = {'sections': 7, 'repeated_sections': 1,
+                           'tweets': 59, 'duplicates': 3}
+        msg = "Expected {}, but returned {}".format(expected_report,
+                                                    merger.report())
+        self.assertEqual(merger.report(), expected_report, msg)
+
+        # reading the files one after the other into a merger is the same
+        merger = tweets.TweetMerger()
+        tweets.read_tweets(io.StringIO(big), merger)
+        actual = tweets.read_tweets(io.StringIO(small), merger)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertEqual(merger.report(), expected_report)
+
+
+    def test_duplicate_in_section(self):
+        """Test a duplicate tweet within one user section is dropped by every
+        way of reading a file.
+        """
+        contents = 'UTM:\n' + '1,Home,Web,2,3\nHi\n<<<EOT\n' * 2
+        expected = {'utm': [('Hi', 1, 'Web', 2, 3)]}
+        merger = tweets.TweetMerger()
+        actual = tweets.read_tweets(io.StringIO(contents), merger)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertEqual(merger.duplicates, 1)
+        # only a fixed-size digest of each tweet is kept
+        self.assertEqual([len(key) for key in merger._keys['utm']], [16])
+
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as file:
+            file.write(contents)
+        try:
+            for chunk_size in [1, 1000]:
+                actual = tweets.read_tweets_parallel([path], workers=1,
+                                                     chunk_size=chunk_size)
+                msg = "Expected {}, but returned {}".format(expected, actual)
+                self.assertEqual(actual, expected, msg)
+            with tweets.TweetFile(path) as tweet_file:
+                actual = tweet_file.to_dict()
+                self.assertEqual(tweet_file.duplicates, 1)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+            state = tweets.TweetState(path)
+            self.assertEqual(tweets.append_tweets(state), 1)
+            self.assertEqual(state.users_to_tweets, expected)
+        finally:
+            os.remove(path)
+
+
+    def test_concatenated_parallel(self):
+        """Test read_tweets_parallel merges a repeated user section the same
+        way as read_tweets however the file is split into chunks.
+        """
+        with open('tweets_big.txt') as file:
+            contents = file.read()
+        with open('tweets_small.txt') as file:
+            contents += file.read()
+        expected = tweets.read_tweets(io.StringIO(contents))
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as file:
+            file.write(contents)
+        try:
+            for chunk_size in [1, 2000, 1000000]:
+                actual = tweets.read_tweets_parallel(
+                    [path], workers=1, chunk_size=chunk_size)
+                msg = "Expected {}, but returned {}".format(expected, actual)
+                self.assertEqual(actual, expected, msg)
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,121 @@
+"""Tester for the function tokenize in tweets, compared with the original
+token loops it replaced.
+"""
+
+import unittest
+import tweets
+
+
+def old_alnum_prefix(text):
+    """Return the lowercase alphanumeric prefix of text, as the original
+    alnum_prefix did.
+    """
+    index = 0
+    while index < len(text) and text[index].isalnum():
+        index += 1
+    return text[:index].lower()
+
+
+def old_extract_words(text, phrase):
+    """Return the tokens of text starting with phrase, as the original
+    extract_words did.
+    """
+    return [old_alnum_prefix(element[1:]) for element in text.split()
+            if element.startswith(phrase) and element[1:2].isalnum()]
+
+
+def old_tokenize(text):
+    """Return the mentions, hashtags, URLs and words of text found by the
+    original extract_words, count_words and clean_word.
+    """
+    elements = text.split()
+    words = []
+    for element in elements:
+        if not element.startswith((tweets.MENTION_SYMBOL, tweets.HASH_SYMBOL,
+                                   tweets.URL_START)):
+            word = ''.join(char for char in element.lower()
+                           if char.isalnum())
+            if word != '':
+                words.append(word)
+    return tweets.Tokens(old_extract_words(text, tweets.MENTION_SYMBOL),
+                         old_extract_words(text, tweets.HASH_SYMBOL),
+                         [element for element in elements
+                          if element.startswith(tweets.URL_START)],
+                         words)
+
+
+class TestTokenize(unittest.TestCase):
+    """Tests for the function tokenize in tweets.
+    """
+
+    def check(self, text):
+        """Check tokenize and the functions using it agree with the original
+        logic on text.
+        """
+        expected = old_tokenize(text)
+        actual = tweets.tokenize(text)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+        actual = tweets.extract_mentions(text)
+        msg = "Expected {}, but returned {}".format(expected.mentions, actual)
+        self.assertEqual(actual, expected.mentions, msg)
+
+        hashtags = list(dict.fromkeys(expected.hashtags))
+        actual = tweets.extract_hashtags(text)
+        msg = "Expected {}, but returned {}".format(hashtags, actual)
+        self.assertEqual(actual, hashtags, msg)
+
+        counts = {'ok': 1}
+        for word in expected.words:
+            counts[word] = counts.get(word, 0) + 1
+        actual = {'ok': 1}
+        tweets.count_words(text, actual)
+        msg = "Expected {}, but it was {}".format(counts, actual)
+        self.assertEqual(list(actual.items()), list(counts.items()), msg)
+
+
+    def test_non_ascii(self):
+        """Test non-ASCII letters and numbers are alphanumeric.
+        """
+        self.check('Café @Zoë #naïve ½ ²³ 東京 @½x #東京! straße É?')
+
+
+    def test_underscores(self):
+        """Test underscores end mentions and hashtags and are removed from
+        words.
+        """
+        self.check('@user_name #tag_x snake_case __ _ @_x #_y ok_')
+
+
+    def test_symbols_inside(self):
+        """Test @ and # inside a token neither start a mention or hashtag
+        nor stop a word.
+        """
+        self.check('ok@bye a#b c@@d e#f@g @a@b #c#d ok# ok@')
+
+
+    def test_urls(self):
+        """Test a bare http and tokens starting with it are URLs, and only
+        in lowercase.
+        """
+        self.check('http http://a.ca https://b.ca httpx HTTP://c.ca Http '
+                   'see:http://d.ca')
+
+
+    def test_whitespace(self):
+        """Test tabs, newlines and other Unicode whitespace separate tokens.
+        """
+        self.check('a\tb\u00a0c\u2003@d\u3000#e\nf\x1cg\r\n\vh\fi\u2028'
+                   '\u205fhttp://j.ca\u0085k\t\t')
+
+
+    def test_no_alnum_prefix(self):
+        """Test mentions and hashtags with no alphanumeric prefix are left
+        out.
+        """
+        self.check('@ @! @@y #_ # #!x @.a ## @#z')
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,165 @@
+"""Tester for the functions read_tweets_cached and load_tweet_cache in tweets.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import tweets
+
+class TestTweetCache(unittest.TestCase):
+    """Tests for the functions read_tweets_cached and load_tweet_cache in
+    tweets.
+    """
+
+    def setUp(self):
+        """Copy tweets_big.txt into a temporary directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'tweets.txt')
+        shutil.copy('tweets_big.txt', self.path)
+        with open('tweets_big.txt') as file:
+            self.expected = tweets.read_tweets(file)
+
+
+    def tearDown(self):
+        """Remove the temporary directory.
+        """
+        shutil.rmtree(self.directory)
+
+
+    def test_round_trip(self):
+        """Test a fresh parse and a warm start give the same result.
+        """
+        self.assertIsNone(tweets.load_tweet_cache(self.path))
+        self.assertEqual(tweets.read_tweets_cached(self.path), self.expected)
+        self.assertTrue(os.path.exists(self.path + tweets.CACHE_SUFFIX))
+        actual = tweets.load_tweet_cache(self.path, verify_hash=True)
+        msg = "Expected {}, but returned {}".format(self.expected, actual)
+        self.assertEqual(actual, self.expected, msg)
+
+
+    def test_touched_source(self):
+        """Test a cache stays valid when only the modification time of the
+        source file changes.
+        """
+        tweets.read_tweets_cached(self.path)
+        status = os.stat(self.path)
+        os.utime(self.path, ns=(status.st_atime_ns,
+                                status.st_mtime_ns + 10 ** 9))
+        with mock.patch.object(tweets, '_file_digest',
+                               wraps=tweets._file_digest) as digest:
+            for _ in range(3):
+                self.assertEqual(tweets.load_tweet_cache(self.path),
+                                 self.expected)
+        # the new modification time is stored after the first check
+        self.assertEqual(digest.call_count, 1)
+
+
+    def test_grown_while_parsing(self):
+        """Test a cache is out of date when the source file grows after it
+        was parsed and before the cache was written.
+        """
+        read_tweets = tweets.read_tweets
+
+        def read_and_grow(file):
+            users_to_tweets = read_tweets(file)
+            with open(self.path, 'a') as source:
+                source.write('UTM:\n1,Home,Web,2,3\nHi\n<<<EOT\n')
+            return users_to_tweets
+
+        with mock.patch.object(tweets, 'read_tweets', read_and_grow):
+            actual = tweets.read_tweets_cached(self.path)
+        self.assertEqual(actual, self.expected)
+        self.assertIsNone(tweets.load_tweet_cache(self.path))
+        with open(self.path) as file:
+            expected = tweets.read_tweets(file)
+        self.assertEqual(tweets.read_tweets_cached(self.path), expected)
+        self.assertEqual(tweets.load_tweet_cache(self.path), expected)
+
+
+    def test_profiled(self):
+        """Test a profile counts the tweets and source bytes of each call,
+        whether it was cached or not.
+        """
+        with tweets.profile() as stats:
+            for _ in range(2):
+                tweets.read_tweets_cached(self.path)
+        num_tweets = sum(len(user_tweets)
+                         for user_tweets in self.expected.values())
+        expected = {'calls': 2, 'records': 2 * num_tweets,
+                    'bytes': 2 * os.path.getsize(self.path)}
+        actual = {key: stats.stages['read_tweets_cached'][key]
+                  for key in expected}
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+    def test_damaged_cache(self):
+        """Test a cache cut short or with extra bytes is parsed again and
+        rewritten.
+        """
+        tweets.read_tweets_cached(self.path)
+        cache_path = self.path + tweets.CACHE_SUFFIX
+        with open(cache_path, 'rb') as file:
+            data = file.read()
+        for damaged in [data[:-3], data[:-1000], data[:len(data) // 2],
+                        data[:tweets._CACHE_HEADER.size + 1], data + b'\0']:
+            with open(cache_path, 'wb') as file:
+                file.write(damaged)
+            self.assertIsNone(tweets.load_tweet_cache(self.path))
+            actual = tweets.read_tweets_cached(self.path)
+            msg = "Expected {}, but returned {}".format(self.expected, actual)
+            self.assertEqual(actual, self.expected, msg)
+            self.assertEqual(tweets.load_tweet_cache(self.path), 
+                             self.expected)
+
+
+    def test_concurrent_writers(self):
+        """Test caches written at the same time don't use the same temporary
+        file.
+        """
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def write():
+            barrier.wait()
+            try:
+                tweets.write_tweet_cache(self.expected, self.path)
+            except OSError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['tweets.txt', 'tweets.txt' + tweets.CACHE_SUFFIX])
+        self.assertEqual(tweets.load_tweet_cache(self.path), self.expected)
+
+
+    def test_changed_source(self):
+        """Test a cache is out of date when the source file changes, even if
+        its size and modification time stay the same.
+        """
+        tweets.read_tweets_cached(self.path)
+        status = os.stat(self.path)
+        with open(self.path, 'r+') as file:
+            file.write('UofTCompSc1:')
+        os.utime(self.path, ns=(status.st_atime_ns, status.st_mtime_ns))
+        self.assertIsNotNone(tweets.load_tweet_cache(self.path))
+        self.assertIsNone(tweets.load_tweet_cache(self.path,
+                                                  verify_hash=True))
+
+        with open(self.path) as file:
+            expected = tweets.read_tweets(file)
+        self.assertEqual(tweets.read_tweets_cached(self.path,
+                                                   verify_hash=True), expected)
+        self.assertEqual(tweets.load_tweet_cache(self.path), expected)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
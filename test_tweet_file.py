@@ -0,0 +1,102 @@
+"""Tester for the class TweetFile in tweets.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import tweets
+
+class TestTweetFile(unittest.TestCase):
+    """Tests for the class TweetFile in tweets.
+    """
+
+    def check_same_as_read_tweets(self, contents):
+        """Check TweetFile reads the same tweets as read_tweets from a file
+        with contents.
+        """
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w', newline='') as file:
+            file.write(contents)
+        try:
+            expected = tweets.read_tweets(io.StringIO(contents))
+            with tweets.TweetFile(path) as tweet_file:
+                actual = tweet_file.to_dict()
+        finally:
+            os.remove(path)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_empty(self):
+        """Test an empty file.
+        """
+        self.check_same_as_read_tweets('')
+
+
+    def test_tricky_lines(self):
+        """Test leading lines, text lines ending in a colon, users without
+        tweets and an unfinished tweet at the end of the file.
+        """
+        self.check_same_as_read_tweets(
+            'junk\nUofT:\n1,Home,Web,2,3\nbro chill:\n\nlol:\n<<<EOT\n' +
+            'UTM:\nUTSC:\n4,Home,Web,5,6\n  Hi  \n<<<EOT\n' +
+            '7,Home,Web,8,9\nunfinished\n')
+
+
+    def test_repeated_user(self):
+        """Test a repeated user section is merged without duplicates.
+        """
+        with open('tweets_big.txt') as file:
+            contents = file.read()
+        with open('tweets_small.txt') as file:
+            contents += file.read()
+        self.check_same_as_read_tweets(contents)
+        self.check_same_as_read_tweets(
+            'UofT:\n1,Home,Web,2,3\nHi\n<<<EOT\nUTM:\n' +
+            'UofT:\n1,Home,Web,5,6\n Hi\n<<<EOT\n2,Home,Web,2,3\nHi\n<<<EOT\n')
+
+        # duplicates differing only in non-ASCII whitespace around the text
+        self.check_same_as_read_tweets(
+            'UofT:\n1,Home,Web,2,3\n\u00a0Hi\u2003\n<<<EOT\n' +
+            '1,Home,Web,2,3\nHi\n<<<EOT\n1,Home,Web,2,3\n\x1cHi\n<<<EOT\n')
+
+
+    def test_index_without_decoding(self):
+        """Test opening a file decodes only usernames, not tweet texts.
+        """
+        decoded = []
+        decode = tweets.TweetFile._decode
+
+        def record_decode(tweet_file, start, end):
+            decoded.append(decode(tweet_file, start, end))
+            return decoded[-1]
+
+        with mock.patch.object(tweets.TweetFile, '_decode', record_decode):
+            with tweets.TweetFile('tweets_big.txt') as tweet_file:
+                usernames = tweet_file.usernames()
+        actual = sorted(set(text.lower() for text in decoded))
+        expected = sorted(usernames)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_sample_files(self):
+        """Test both sample files, including popularity from metadata only.
+        """
+        for name in ['tweets_small.txt', 'tweets_big.txt']:
+            with open(name) as file:
+                expected = tweets.read_tweets(file)
+            with tweets.TweetFile(name) as tweet_file:
+                self.assertEqual(tweet_file.to_dict(), expected)
+                self.assertEqual(tweet_file.usernames(), list(expected))
+                for start, end in [(0, 20181106202405),
+                                   (20181106202405, 20181231000000)]:
+                    self.assertEqual(
+                        tweets.most_popular(tweet_file, start, end),
+                        tweets.most_popular(expected, start, end))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,125 @@
+"""Tester for the class TweetPipeline in tweets.
+"""
+
+import asyncio
+import io
+import unittest
+import tweets
+
+class TestTweetPipeline(unittest.TestCase):
+    """Tests for the class TweetPipeline in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt.
+        """
+        with open('tweets_big.txt', 'rb') as file:
+            self.contents = file.read()
+        with open('tweets_big.txt') as file:
+            self.expected = tweets.read_tweets(file)
+
+
+    def test_fed_in_pieces(self):
+        """Test reading data fed in pieces that split lines and characters.
+        """
+        contents = self.contents.replace(b'chill', 'chíll'.encode('utf-8'))
+        expected = tweets.read_tweets(
+            io.StringIO(contents.decode('utf-8')))
+
+        async def read():
+            reader = asyncio.StreamReader()
+            for i in range(0, len(contents), 7):
+                reader.feed_data(contents[i:i + 7])
+            reader.feed_eof()
+            return await tweets.read_tweets_async(reader)
+
+        actual = asyncio.run(read())
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_loopback_server(self):
+        """Test a server reading tweets sent over a socket into a TweetState.
+        """
+        state = tweets.TweetState()
+        counts = []
+
+        async def handle(reader, writer):
+            pipeline = tweets.TweetPipeline(chunk_size=1000)
+            pipeline.add_consumer(state.add_record)
+            counts.append(await pipeline.run(reader))
+            writer.close()
+
+        async def send():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(self.contents)
+            await writer.drain()
+            writer.write_eof()
+            await reader.read()
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(send())
+        expected = sum(len(user_tweets)
+                       for user_tweets in self.expected.values())
+        msg = "Expected {}, but returned {}".format(expected, counts)
+        self.assertEqual(counts, [expected], msg)
+        self.assertEqual(state.users_to_tweets, self.expected)
+
+
+    def test_backpressure(self):
+        """Test reading waits while a consumer is blocked.
+        """
+        seen = []
+        read = []
+        release = None
+
+        async def slow(username, tweet):
+            if tweet is not None:
+                await release.wait()
+                read.append(tweet)
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.contents)
+            reader.feed_eof()
+            pipeline = tweets.TweetPipeline(queue_size=1, chunk_size=500)
+            pipeline.add_consumer(lambda username, tweet: seen.append(tweet))
+            pipeline.add_consumer(slow)
+            task = asyncio.ensure_future(pipeline.run(reader))
+            await asyncio.sleep(0.05)
+            blocked = len(seen)
+            release.set()
+            return (blocked, await task)
+
+        blocked, num_tweets = asyncio.run(run())
+        msg = "Expected fewer than {} records before release, but read {}"
+        self.assertTrue(blocked < num_tweets, msg.format(num_tweets, blocked))
+        self.assertEqual(len(read), num_tweets)
+
+
+    def test_consumer_error(self):
+        """Test an error in a consumer stops run.
+        """
+        def fail(username, tweet):
+            raise ValueError(username)
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.contents)
+            reader.feed_eof()
+            pipeline = tweets.TweetPipeline(queue_size=1, chunk_size=500)
+            pipeline.add_consumer(fail)
+            await pipeline.run(reader)
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
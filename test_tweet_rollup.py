@@ -0,0 +1,167 @@
+"""Tester for the class TweetRollup in tweets.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import tweets
+
+class TestTweetRollup(unittest.TestCase):
+    """Tests for the class TweetRollup in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt.
+        """
+        with open('tweets_big.txt') as file:
+            self.users_to_tweets = tweets.read_tweets(file)
+
+
+    def expected_counts(self, start, end):
+        """Return the popularity, hashtag counts and word counts of the
+        tweets from start to end computed from every tweet.
+        """
+        popularity = tweets.PopularityIndex.from_dict(
+            self.users_to_tweets).popularity(start, end)
+        hashtags = {}
+        words = {}
+        for user in self.users_to_tweets:
+            for tweet in self.users_to_tweets[user]:
+                if start <= tweet.date <= end:
+                    for hashtag in tweets.extract_hashtags(tweet.text):
+                        hashtags[hashtag] = hashtags.get(hashtag, 0) + 1
+                    tweets.count_words(tweet.text, words)
+        return (popularity, hashtags, words)
+
+
+    def check_buckets(self, actual, expected):
+        """Check rollups actual and expected have the same buckets, whatever
+        order the tweets of each bucket were added in.
+        """
+        self.assertEqual(actual.bucket_keys, expected.bucket_keys)
+        for key in expected.bucket_keys:
+            actual_bucket = dict(vars(actual.buckets[key]))
+            expected_bucket = dict(vars(expected.buckets[key]))
+            for bucket in [actual_bucket, expected_bucket]:
+                bucket['tweets'] = {user: sorted(user_tweets) for user,
+                                    user_tweets in bucket['tweets'].items()}
+            self.assertEqual(actual_bucket, expected_bucket)
+
+
+    def test_whole_buckets(self):
+        """Test ranges of whole days and hours against every tweet.
+        """
+        daily = tweets.TweetRollup.from_dict(self.users_to_tweets)
+        hourly = tweets.TweetRollup.from_dict(self.users_to_tweets, 'hour')
+        for rollup, start, end in [
+                (daily, 20181101000000, 20181109235959),
+                (daily, 20181104000000, 20181104235959),
+                (daily, 0, 99999999999999),
+                (hourly, 20181108130000, 20181108175959),
+                (hourly, 20181106000000, 20181107115959)]:
+            expected = self.expected_counts(start, end)
+            actual = (rollup.popularity(start, end),
+                      rollup.hashtag_counts(start, end),
+                      rollup.word_counts(start, end))
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+            self.assertEqual(tweets.most_popular(rollup, start, end),
+                             tweets.most_popular(self.users_to_tweets,
+                                                 start, end))
+            # whole buckets are used as they are, without their tweets
+            with mock.patch.object(tweets.RollupBucket, 'add') as add:
+                buckets = rollup.buckets_between(start, end)
+            self.assertEqual(add.call_count, 0)
+            self.assertTrue(all(bucket in rollup.buckets.values()
+                                for bucket in buckets))
+
+
+    def test_part_buckets(self):
+        """Test ranges that start or end inside a bucket.
+        """
+        daily = tweets.TweetRollup.from_dict(self.users_to_tweets)
+        hourly = tweets.TweetRollup.from_dict(self.users_to_tweets, 'hour')
+        for rollup in [daily, hourly]:
+            for start, end in [(20181101120000, 20181108132750),
+                               (20181104000000, 20181106202405),
+                               (20181106202405, 20181106202405),
+                               (20181103153000, 20181109120000)]:
+                expected = self.expected_counts(start, end)
+                actual = (rollup.popularity(start, end),
+                          rollup.hashtag_counts(start, end),
+                          rollup.word_counts(start, end))
+                msg = "Expected {}, but returned {}".format(expected, actual)
+                self.assertEqual(actual, expected, msg)
+
+        users_to_tweets = {'a': [('hi', 20181101010000, 'pop', 5, 0)],
+                           'b': [('hi', 20181101230000, 'pop', 3, 0)]}
+        rollup = tweets.TweetRollup.from_dict(users_to_tweets)
+        expected = 'b'
+        actual = tweets.most_popular(rollup, 20181101120000, 20181101235959)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_common_words(self):
+        """Test common_words keeps the same words as common_words.
+        """
+        rollup = tweets.TweetRollup.from_dict(self.users_to_tweets)
+        expected = self.expected_counts(20181101000000, 20181109235959)[2]
+        tweets.common_words(expected, 10)
+        actual = rollup.common_words(20181101000000, 20181109235959, 10)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+
+    def test_appended_out_of_order(self):
+        """Test adding tweets in a random order gives the same buckets.
+        """
+        expected = tweets.TweetRollup.from_dict(self.users_to_tweets, 'hour')
+        pairs = [(user, tweet) for user in self.users_to_tweets
+                 for tweet in self.users_to_tweets[user]]
+        random.Random(2018).shuffle(pairs)
+        actual = tweets.TweetRollup('hour')
+        for user in self.users_to_tweets:
+            actual.add_user(user)
+        for user, tweet in pairs:
+            actual.add_tweet(user, tweet)
+        self.check_buckets(actual, expected)
+
+
+    def test_tweet_state(self):
+        """Test a rollup kept by a TweetState while its file grows.
+        """
+        with open('tweets_big.txt', 'rb') as file:
+            contents = file.read()
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'tweets.txt')
+            rollup = tweets.TweetRollup()
+            state = tweets.TweetState(path, rollups=[rollup])
+            with open(path, 'wb') as file:
+                for i in range(0, len(contents), 1000):
+                    file.write(contents[i:i + 1000])
+                    file.flush()
+                    tweets.append_tweets(state)
+            # appending the same tweets again must not count them twice
+            with open('tweets_big.txt') as file:
+                tweets.append_tweets(state, tweets.iter_tweets(file))
+        finally:
+            shutil.rmtree(directory)
+        expected = tweets.TweetRollup.from_dict(self.users_to_tweets)
+        self.assertEqual(list(rollup.usernames), list(expected.usernames))
+        self.check_buckets(rollup, expected)
+
+
+    def test_bad_granularity(self):
+        """Test an unknown granularity is rejected.
+        """
+        with self.assertRaises(ValueError):
+            tweets.TweetRollup('week')
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,173 @@
+"""Tester for the class TweetStore in tweets.
+"""
+
+import io
+import re
+import unittest
+import tweets
+
+class TestTweetStore(unittest.TestCase):
+    """Tests for the class TweetStore in tweets.
+    """
+
+    def setUp(self):
+        """Read tweets_big.txt.
+        """
+        with open('tweets_big.txt') as file:
+            self.users_to_tweets = tweets.read_tweets(file)
+        self.store = tweets.TweetStore.from_dict(self.users_to_tweets)
+
+
+    def test_empty(self):
+        """Test a store with no users.
+        """
+        store = tweets.TweetStore.from_dict({})
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.to_dict(), {})
+        self.assertEqual(tweets.most_popular(store, 0, 1), 'tie')
+
+
+    def test_round_trip(self):
+        """Test converting to a store and back gives the same tweets.
+        """
+        actual = self.store.to_dict()
+        msg = "Expected {}, but returned {}".format(self.users_to_tweets,
+                                                    actual)
+        self.assertEqual(actual, self.users_to_tweets, msg)
+        self.assertEqual(len(self.store), 58)
+
+
+    def test_most_popular(self):
+        """Test most_popular gives the same result for a store.
+        """
+        for start, end in [(0, 30000000000000),
+                           (20181104000000, 20181107000000),
+                           (20181106202405, 20181106202405)]:
+            expected = tweets.most_popular(self.users_to_tweets, start, end)
+            actual = tweets.most_popular(self.store, start, end)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_detect_author(self):
+        """Test detect_author gives the same result for a store.
+        """
+        for text in ['#UofT', '#StartAI', '#deeplearning #AI', 'no hashtags']:
+            expected = tweets.detect_author(self.users_to_tweets, text)
+            actual = tweets.detect_author(self.store, text)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_most_popular_many(self):
+        """Test most_popular_many agrees with most_popular on every date range,
+        including single dates, empty ranges and ties.
+        """
+        dates = sorted(set(self.store.dates))
+        date_ranges = [(0, 1), (0, 30000000000000)]
+        for date in dates:
+            date_ranges += [(date, date), (date - 1, date + 1000000),
+                            (date + 1, dates[-1])]
+        expected = [tweets.most_popular(self.users_to_tweets, start, end)
+                    for start, end in date_ranges]
+        actual = tweets.most_popular_many(self.store, date_ranges)
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertIn('tie', actual)
+        self.assertEqual(tweets.most_popular_many(self.store, []), [])
+
+
+
+    def test_locations(self):
+        """Test the locations of a store read from tweets_big.txt and the
+        aggregations over each location.
+        """
+        with open('tweets_big.txt') as file:
+            store = tweets.TweetStore.from_file(file)
+        self.assertEqual(store.to_dict(), self.users_to_tweets)
+
+        # the location of every tweet, in the order of the file, from the
+        # metadata lines
+        with open('tweets_big.txt') as file:
+            expected_locations = re.findall(
+                r'(?m)^\d+,([^,\n]*),[^,\n]*,\d+,\d+$', file.read())
+        actual = [store.location_of(row) for row in range(len(store))]
+        msg = "Expected {}, but returned {}".format(expected_locations,
+                                                    actual)
+        self.assertEqual(actual, expected_locations, msg)
+        self.assertEqual(len(store.locations), len(set(expected_locations)))
+
+        for location in store.locations:
+            # the tweets of each user from location
+            users = {username: [] for username in self.users_to_tweets}
+            for row in range(len(store)):
+                if expected_locations[row] == location:
+                    users[store.usernames[store.user_ids[row]]].append(
+                        store.tweet(row))
+
+            expected = tweets.PopularityIndex.from_dict(users).popularity(
+                20181101000000, 20181110000000)
+            actual = store.location_popularity(location, 20181101000000,
+                                               20181110000000)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+            texts = [tweet.text for user in users for tweet in users[user]]
+            expected = {}
+            tweets.count_words_many(texts, expected)
+            tweets.common_words(expected, 5)
+            actual = store.location_words(location, 5)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+            expected = {}
+            for text in texts:
+                for hashtag in tweets.extract_hashtags(text):
+                    expected[hashtag] = expected.get(hashtag, 0) + 1
+            tweets.common_words(expected, 3)
+            actual = store.location_hashtags(location, 3)
+            msg = "Expected {}, but returned {}".format(expected, actual)
+            self.assertEqual(actual, expected, msg)
+
+
+    def test_from_file_with_merger(self):
+        """Test from_file with a merger, which must not hold tweets whose
+        locations are unknown.
+        """
+        merger = tweets.TweetMerger()
+        merger.add_user('uoft')
+        store = tweets.TweetStore.from_file(
+            io.StringIO('UTM:\n2,Away,Web,2,3\nBye\n<<<EOT\n'), merger)
+        expected = {'uoft': [], 'utm': [('Bye', 2, 'Web', 2, 3)]}
+        actual = store.to_dict()
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertEqual(store.location_of(0), 'Away')
+
+        merger = tweets.TweetMerger()
+        tweets.read_tweets(io.StringIO('UTM:\n1,Home,Web,2,3\nHi\n<<<EOT\n'),
+                           merger)
+        with self.assertRaises(ValueError):
+            tweets.TweetStore.from_file(
+                io.StringIO('UTM:\n2,Away,Web,2,3\nBye\n<<<EOT\n'), merger)
+
+
+    def test_from_dict_locations(self):
+        """Test from_dict rejects a user with a different number of locations
+        than tweets.
+        """
+        users_to_tweets = {'uoft': [('Hi', 1, 'Web', 2, 3),
+                                    ('Bye', 2, 'Web', 2, 3)]}
+        for locations in [['Home'], ['Home', 'Away', 'Home']]:
+            with self.assertRaises(ValueError):
+                tweets.TweetStore.from_dict(users_to_tweets,
+                                            {'uoft': locations})
+        store = tweets.TweetStore.from_dict(users_to_tweets,
+                                            {'uoft': ['Home', 'Away']})
+        expected = ['Home', 'Away']
+        actual = [store.location_of(row) for row in range(len(store))]
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
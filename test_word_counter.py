@@ -0,0 +1,76 @@
+"""Tester for the class WordCounter in tweets.
+"""
+
+import random
+import unittest
+import tweets
+
+class TestWordCounter(unittest.TestCase):
+    """Tests for the class WordCounter in tweets.
+    """
+
+    def setUp(self):
+        """Make texts with a skewed word frequency.
+        """
+        generator = random.Random(2018)
+        words = ['w{}'.format(int(generator.paretovariate(1.2)))
+                 for _ in range(100000)]
+        self.texts = [' '.join(words[i:i + 20])
+                      for i in range(0, len(words), 20)]
+        self.exact = tweets.WordCounter()
+        for text in self.texts:
+            self.exact.update(text)
+
+
+    def test_exact(self):
+        """Test the exact mode gives the same counts as count_words.
+        """
+        expected = {}
+        tweets.count_words_many(self.texts, expected)
+        actual = self.exact.counts
+        msg = "Expected {}, but returned {}".format(expected, actual)
+        self.assertEqual(actual, expected, msg)
+        self.assertEqual(self.exact.error_bound(), 0)
+        self.assertEqual(self.exact.total, 100000)
+
+
+    def test_large_capacity(self):
+        """Test the approximate mode is exact when every word fits.
+        """
+        counter = tweets.WordCounter(capacity=len(self.exact.counts))
+        for text in self.texts:
+            counter.update(text)
+        self.assertEqual(counter.counts, self.exact.counts)
+        self.assertEqual(counter.error_bound(), 0)
+
+
+    def test_error_bounds(self):
+        """Test every approximate count is within its error of the true
+        count, and every frequent word is kept.
+        """
+        capacity = 100
+        counter = tweets.WordCounter(capacity)
+        for text in self.texts:
+            counter.update(text)
+        self.assertLessEqual(len(counter.counts), capacity)
+        self.assertLessEqual(counter.error_bound(), counter.total // capacity)
+        for word, count in counter.counts.items():
+            self.assertLessEqual(count - counter.errors[word],
+                                 self.exact.counts[word])
+            self.assertLessEqual(self.exact.counts[word], count)
+        for word, count in self.exact.counts.items():
+            if count > counter.total / capacity:
+                self.assertIn(word, counter.counts)
+        self.assertEqual(counter.common_words(5),
+                         self.exact.common_words(5))
+
+
+    def test_bad_capacity(self):
+        """Test a capacity that is not positive is rejected.
+        """
+        for capacity in [0, -1]:
+            with self.assertRaises(ValueError):
+                tweets.WordCounter(capacity)
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -1,11 +1,54 @@
 """Tweet Analysis"""
 
-from typing import List, Dict, TextIO, Tuple
+import contextvars
+import functools
+import hashlib
+import heapq
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import (List, Dict, TextIO, Tuple, Iterator, Iterable, Optional,
+                    NamedTuple, Callable)
 
 HASH_SYMBOL = '#'
 MENTION_SYMBOL = '@'
 URL_START = 'http'
 
+# Precompiled patterns used by tokenize. They run on text whose tokens are
+# separated by single spaces, with a space before the first token. [^\W_]
+# matches exactly the characters for which str.isalnum() is True.
+_ALNUM_PREFIX = re.compile(r'[^\W_]*')
+_MENTION_PATTERN = re.compile(' ' + MENTION_SYMBOL + r'([^\W_]+)')
+_HASHTAG_PATTERN = re.compile(' ' + HASH_SYMBOL + r'([^\W_]+)')
+_URL_PATTERN = re.compile(' ({}[^ ]*)'.format(re.escape(URL_START)))
+_NOT_WORD_PATTERN = re.compile(' (?:[{}{}]|{})[^ ]*'.format(
+    MENTION_SYMBOL, HASH_SYMBOL, re.escape(URL_START)))
+_NON_ALNUM_PATTERN = re.compile(r'[\W_]')
+_NON_ALNUM_OR_SPACE_PATTERN = re.compile(r'[^\w ]|_')
+# ASCII text is cleaned with bytes.translate, which is much faster than a
+# regex substitution
+_ASCII_NON_ALNUM = bytes(code for code in range(128)
+                         if not chr(code).isalnum())
+_ASCII_NON_ALNUM_OR_SPACE = _ASCII_NON_ALNUM.replace(b' ', b'')
+
+# Markers used by the tweet file format
+USERNAME_END = ':\n'
+END_OF_TWEET = '<<<EOT\n'
+
+# Sidecar cache of a parsed tweet file
+CACHE_SUFFIX = '.tweetcache'
+CACHE_MAGIC = b'TWEETC02'
+
 # Order of data in the file
 FILE_DATE_INDEX = 0
 FILE_LOCATION_INDEX = 1
@@ -20,6 +63,211 @@ TWEET_SOURCE_INDEX = 2
 TWEET_FAVOURITE_INDEX = 3
 TWEET_RETWEET_INDEX = 4
 
+
+class Tokens(NamedTuple):
+    """The cleaned mentions, hashtags, URLs and words of a text."""
+    mentions: List[str]
+    hashtags: List[str]
+    urls: List[str]
+    words: List[str]
+
+
+class Tweet(NamedTuple):
+    """A tweet. It is a tuple, so it can also be indexed with the
+    TWEET_*_INDEX constants.
+
+    """
+    text: str
+    date: int
+    source: str
+    favourites: int
+    retweets: int
+
+
+class LeaderboardEntry(NamedTuple):
+    """A group of users tied on popularity in popularity_leaderboard."""
+    rank: int
+    popularity: int
+    usernames: List[str]
+
+
+# Profiling
+
+# the Profile that records timings while profile() is active, else None;
+# a context variable so threads and asyncio tasks each see their own
+_profile = contextvars.ContextVar('_profile', default=None)
+
+
+class Profile:
+    """Timings, sizes and memory use of each stage of the tweets functions
+    recorded while profile() is active.
+
+    stages maps each stage name to its number of calls, wall time in seconds,
+    bytes and records (lines, tweets, texts or date ranges) processed and, if
+    memory is traced, the peak memory allocated in bytes. A stage may include
+    the time of stages it calls, e.g. count_words includes tokenize, and a
+    batch stage counts the records of all its calls, e.g. read_tweets counts
+    the tweets it built.
+
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.peak_memory = 0
+        self._depth = 0
+
+    def add(self, stage: str, seconds: float, num_bytes: int = 0, 
+            records: int = 0, peak_memory: int = 0) -> None:
+        """Record one call of stage."""
+        if stage not in self.stages:
+            self.stages[stage] = {'calls': 0, 'seconds': 0.0, 'bytes': 0,
+                                  'records': 0, 'peak_memory': 0}
+        stats = self.stages[stage]
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['bytes'] += num_bytes
+        stats['records'] += records
+        stats['peak_memory'] = max(stats['peak_memory'], peak_memory)
+
+    def merge(self, stages: Dict[str, Dict[str, object]]) -> None:
+        """Add the stages recorded by another Profile, such as one from a
+        worker process.
+
+        """
+        for stage, other in stages.items():
+            if stage not in self.stages:
+                self.stages[stage] = {'calls': 0, 'seconds': 0.0, 'bytes': 0,
+                                      'records': 0, 'peak_memory': 0}
+            stats = self.stages[stage]
+            for key in ['calls', 'seconds', 'bytes', 'records']:
+                stats[key] += other[key]
+            stats['peak_memory'] = max(stats['peak_memory'], 
+                                       other['peak_memory'])
+
+    def _total(self, stage: str, key: str) -> int:
+        """Return the key total of stage so far, or 0 if it has no calls."""
+        stats = self.stages.get(stage)
+        return 0 if stats is None else stats[key]
+
+    def as_dict(self) -> Dict[str, object]:
+        """Return the recorded data as a dictionary."""
+        return {'stages': self.stages, 'peak_memory': self.peak_memory}
+
+    def to_json(self) -> str:
+        """Return the recorded data as JSON.
+
+        >>> with profile() as stats:
+        ...     extract_mentions('@a @b')
+        ['a', 'b']
+        >>> json.loads(stats.to_json())['stages']['tokenize']['records']
+        1
+
+        """
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+
+@contextmanager
+def profile(trace_memory: bool = False, 
+            callback: Callable[[Profile], None] = None) -> Iterator[Profile]:
+    """Record the stages of tweets functions called in the with block in a
+    Profile. If trace_memory is True, peak memory is measured with
+    tracemalloc, which slows everything down. callback, if given, is called
+    with the Profile at the end of the block.
+
+    """
+    current = Profile(trace_memory)
+    started_tracing = False
+    if trace_memory:
+        import tracemalloc
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+    token = _profile.set(current)
+    try:
+        yield current
+    finally:
+        _profile.reset(token)
+        if trace_memory:
+            current.peak_memory = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        if callback is not None:
+            callback(current)
+
+
+def _profiled(stage: str, measure: Callable[..., Tuple[int, int]] = None, 
+              inner: Tuple[str, str] = None) -> Callable:
+    """Return a decorator that records each call of a function as stage when
+    profiling, and otherwise adds only a check of _profile.
+
+    Each call counts as 1 record of 0 bytes, unless measure is given, which
+    returns the (bytes, records) processed by a call from its result and its
+    arguments, or inner is given, which names the stages whose bytes and
+    records recorded during a call are the bytes and records of the call.
+
+    """
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            current = _profile.get()
+            if current is None:
+                return func(*args, **kwargs)
+            top_level = current._depth == 0
+            if current.trace_memory and top_level:
+                import tracemalloc
+                tracemalloc.reset_peak()
+            if inner is not None:
+                bytes_before = current._total(inner[0], 'bytes')
+                records_before = current._total(inner[1], 'records')
+            current._depth += 1
+            start = time.perf_counter()
+            completed = False
+            try:
+                result = func(*args, **kwargs)
+                completed = True
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                current._depth -= 1
+                peak = 0
+                if current.trace_memory and top_level:
+                    peak = tracemalloc.get_traced_memory()[1]
+                if inner is not None:
+                    num_bytes = current._total(inner[0], 'bytes') - \
+                        bytes_before
+                    records = current._total(inner[1], 'records') - \
+                        records_before
+                elif measure is not None and completed:
+                    num_bytes, records = measure(result, *args, **kwargs)
+                else:
+                    num_bytes, records = 0, 1
+                current.add(stage, seconds, num_bytes, records, peak)
+        return wrapper
+    return decorate
+
+
+def _text_size(result: object, text: str, *args: object) -> Tuple[int, int]:
+    """Return the size of text in bytes and 1 record."""
+    return len(text.encode('utf-8')), 1
+
+
+def _tweets_size(users_to_tweets: Dict[str, List[tuple]], path: str, 
+                 *args: object, **kwargs: object) -> Tuple[int, int]:
+    """Return the size of the file at path in bytes and the number of tweets
+    in users_to_tweets.
+
+    """
+    return (os.path.getsize(path), 
+            sum(len(tweets) for tweets in users_to_tweets.values()))
+
+
+def _ranges_size(results: List[str], store: object, 
+                 date_ranges: List[Tuple[int, int]]) -> Tuple[int, int]:
+    """Return 0 bytes and the number of date ranges answered."""
+    return 0, len(date_ranges)
+
+
 # Helper functions.
 
 def alnum_prefix(text: str) -> str:
@@ -41,10 +289,7 @@ def alnum_prefix(text: str) -> str:
     ''
     
     """
-    index = 0
-    while index < len(text) and text[index].isalnum():
-        index += 1
-    return text[:index].lower()
+    return _ALNUM_PREFIX.match(text).group().lower()
 
 
 def clean_word(word: str) -> str:
@@ -59,11 +304,45 @@ def clean_word(word: str) -> str:
     'very123messy'
 
     """
-    cleaned_word = ''
-    for char in word.lower():
-        if char.isalnum():
-            cleaned_word = cleaned_word + char
-    return cleaned_word
+    lowered = word.lower()
+    if lowered.isascii():
+        return lowered.encode('ascii').translate(
+            None, _ASCII_NON_ALNUM).decode('ascii')
+    return _NON_ALNUM_PATTERN.sub('', lowered)
+
+
+@_profiled('tokenize', _text_size)
+def tokenize(text: str) -> Tokens:
+    """Return the mentions, hashtags, URLs and words in text, in order and
+    with duplicates included, split on whitespace in one pass.
+
+    Mentions and hashtags are the alphanumeric prefix after the symbol, in
+    lowercase, and tokens with no such prefix are left out. URLs are tokens
+    starting with URL_START. Words are all other tokens cleaned by clean_word,
+    leaving out those that clean to ''.
+
+    >>> tokens = tokenize('Hi @UofT #Cats$ #! http://a.ca ?! ok@bye')
+    >>> tokens.mentions, tokens.hashtags
+    (['uoft'], ['cats'])
+    >>> tokens.urls, tokens.words
+    (['http://a.ca'], ['hi', 'okbye'])
+
+    """
+    # normalising the whitespace lets every pattern find the start of a token
+    # with a literal space
+    spaced = ' ' + ' '.join(text.split())
+    words = _NOT_WORD_PATTERN.sub('', spaced).lower()
+    if words.isascii():
+        words = words.encode('ascii').translate(
+            None, _ASCII_NON_ALNUM_OR_SPACE).decode('ascii')
+    else:
+        words = _NON_ALNUM_OR_SPACE_PATTERN.sub('', words)
+    return Tokens([mention.lower()
+                   for mention in _MENTION_PATTERN.findall(spaced)],
+                  [hashtag.lower()
+                   for hashtag in _HASHTAG_PATTERN.findall(spaced)],
+                  _URL_PATTERN.findall(spaced),
+                  words.split())
 
 
 def extract_words(text: str, phrase: str) -> List[str]:
@@ -81,6 +360,11 @@ def extract_words(text: str, phrase: str) -> List[str]:
     []
     
     """
+    if phrase == MENTION_SYMBOL:
+        return tokenize(text).mentions
+    if phrase == HASH_SYMBOL:
+        return tokenize(text).hashtags
+
     text_lst = text.split()
     result = []
     
@@ -93,6 +377,98 @@ def extract_words(text: str, phrase: str) -> List[str]:
     return result
 
 
+class _TweetParser:
+    """A line-at-a-time state machine for the tweet file format.
+
+    Feed it the lines of a file in order; feed returns (username, None) when a
+    new user section starts, (username, tweet) when a tweet is complete and
+    None otherwise. Only the lines of the tweet being read are held in memory.
+
+    If after_eot is True, parsing starts as if the previous line was
+    END_OF_TWEET, so tweets found before any username get a username of None.
+
+    """
+
+    def __init__(self, after_eot: bool = False) -> None:
+        self.username = None
+        # before the first username all lines are ignored
+        self.seen_user = after_eot
+        self.prev_was_eot = after_eot
+        self.prev_was_user = False
+        self.tweet_lines = []
+        # the metadata line of the last tweet returned
+        self.info_line = None
+
+    def is_username(self, line: str) -> bool:
+        """Return True iff line starts a new user section.
+
+        Aside from the 1st username, all usernames must be precessed by
+        END_OF_TWEET or by another username.
+
+        """
+        return line.endswith(USERNAME_END) and (not self.seen_user or
+                                                self.prev_was_eot or
+                                                self.prev_was_user)
+
+    def advance(self, line: str) -> bool:
+        """Update the parser state for the next line of the file without
+        building any tweets. Return True iff line is a username.
+
+        """
+        is_username = self.is_username(line)
+        if is_username:
+            self.seen_user = True
+        self.prev_was_user = is_username
+        self.prev_was_eot = line == END_OF_TWEET
+        return is_username
+
+    def feed(self, line: str) -> Optional[tuple]:
+        """Process the next line of the file."""
+        return self.take(line, self.advance(line))
+
+    def take(self, line: str, is_username: bool) -> Optional[tuple]:
+        """Add line, which advance has already processed, to the user or tweet
+        being read.
+
+        """
+        if is_username:
+            self.username = line[:-2].lower()
+            self.tweet_lines = []
+            return (self.username, None)
+        if not self.seen_user:
+            return None
+        if line.endswith(END_OF_TWEET):
+            tweet_data = self.tweet_lines
+            self.tweet_lines = []
+            self.info_line = tweet_data[0]
+            return (self.username, make_tweet(tweet_data[0], tweet_data[1:]))
+        self.tweet_lines.append(line)
+        return None
+
+
+def make_tweet(info_line: str, text_lines: List[str]) -> Tweet:
+    """Return a tweet built from the metadata line and the text lines of one
+    tweet in a tweet file. The source is interned, so all tweets with the
+    same source share one str.
+
+    >>> tweet = make_tweet('20181109190529,Toronto,Web,0,27\\n', \
+    ['Hi #UofT\\n', 'bye\\n'])
+    >>> tweet == ('Hi #UofT\\nbye', 20181109190529, 'Web', 0, 27)
+    True
+    >>> tweet.source
+    'Web'
+
+    """
+    # getting date, source, favourite count and retweet count
+    tweet_info = info_line.split(',')
+    return Tweet(''.join(text_lines).strip(),
+                 int(tweet_info[FILE_DATE_INDEX]),
+                 sys.intern(tweet_info[FILE_SOURCE_INDEX]),
+                 int(tweet_info[FILE_FAVOURITE_INDEX]),
+                 int(tweet_info[FILE_RETWEET_INDEX][:-1]))
+
+
+@_profiled('get_usernames')
 def get_usernames(text: List[str]) -> List[int]:
     """ Returns all usernames from text.
     
@@ -102,17 +478,17 @@ def get_usernames(text: List[str]) -> List[int]:
     [0, 2]
     
     """
-    potential = get_indexes(text, ':\n')
+    # a single pass that only remembers what kind of line came before, so
+    # runs of lines ending in ':\n' don't need a search over earlier usernames
+    parser = _TweetParser()
     username = []
-    for index in potential:
-        # aside from the 1st username, all usernames must be precessed by 
-        # '<<<EOT' or by another username
-        if (index == potential[0] or text[index - 1] == '<<<EOT\n' or \
-        (index - 1) in username):
+    for index in range(len(text)):
+        if parser.advance(text[index]):
             username += [index]
     return username
 
 
+@_profiled('get_indexes')
 def get_indexes(text: List[str], s: str) -> List[int]:
     """Return indexes of all elements that end with s in text
 
@@ -148,6 +524,85 @@ def find_key(dictonary: dict, v: object) -> object:
     return result
 
 
+def add_counts(words_to_counts: Dict[str, int], 
+               counts: Dict[str, int]) -> None:
+    """Add each count in counts to words_to_counts, adding new words in the
+    order they appear in counts.
+
+    >>> words = {'a': 1, 'b': 2}
+    >>> add_counts(words, {'c': 1, 'a': 2})
+    >>> words
+    {'a': 3, 'b': 2, 'c': 1}
+
+    """
+    for word, count in counts.items():
+        words_to_counts[word] = words_to_counts.get(word, 0) + count
+
+
+def popular_user(users_to_popularity: Dict[str, int]) -> str:
+    """Return the user with the highest popularity in users_to_popularity, or
+    the string 'tie' if two or more users share it or there are no users.
+
+    >>> popular_user({'user1': 4, 'user2': 6})
+    'user2'
+    >>> popular_user({'user1': 6, 'user2': 6, 'user3': 1})
+    'tie'
+    >>> popular_user({})
+    'tie'
+
+    """
+    #get values list and check how many times max occurs
+    popularity_values = list(users_to_popularity.values())
+
+    if len(popularity_values) == 0 or \
+       popularity_values.count(max(popularity_values)) > 1:
+        result = 'tie'
+    else:
+        result = find_key(users_to_popularity, max(popularity_values))
+           
+    return result
+
+
+def user_texts(users_to_tweets: Dict[str, List[tuple]]) -> \
+    Iterator[Tuple[str, List[str]]]:
+    """Yield each username in users_to_tweets with the texts of their tweets.
+    users_to_tweets may also be a tweet collection such as a TweetStore.
+
+    >>> list(user_texts({'user1': [('#cat', 1, 'pop', 1, 1)], 'user2': []}))
+    [('user1', ['#cat']), ('user2', [])]
+
+    """
+    if not isinstance(users_to_tweets, dict):
+        yield from users_to_tweets.user_texts()
+        return
+    for username, tweets in users_to_tweets.items():
+        yield (username, [tweet[TWEET_TEXT_INDEX] for tweet in tweets])
+
+
+def user_popularity(users_to_tweets: Dict[str, List[tuple]], 
+                    start_date: int, end_date: int) -> Dict[str, int]:
+    """Return the popularity (sum of favourite counts and retweet counts) of
+    every user in users_to_tweets from start_date to end_date (inclusive).
+    users_to_tweets may also be a tweet collection such as a TweetStore,
+    which computes its own popularity.
+
+    >>> user_popularity({'user1': [('1', 110, 'bop', 1, 1), ('1', 112, 'bop', 2, 2)], 'user2': []}, 109, 111)
+    {'user1': 2, 'user2': 0}
+
+    """
+    if not isinstance(users_to_tweets, dict):
+        return users_to_tweets.popularity(start_date, end_date)
+    users_to_popularity = {}
+    for username, tweets in users_to_tweets.items():
+        total = 0
+        for tweet in tweets:
+            if start_date <= tweet[TWEET_DATE_INDEX] <= end_date:
+                total += (tweet[TWEET_FAVOURITE_INDEX] + 
+                          tweet[TWEET_RETWEET_INDEX])
+        users_to_popularity[username] = total
+    return users_to_popularity
+
+
 # Required functions
 
 
@@ -183,18 +638,11 @@ def extract_hashtags(text: str) -> List[str]:
     []
 
     """
-    all_hashtags = extract_words(text, HASH_SYMBOL)
-    
-    unique_hashtags = []
-    
-    # must ensure there are no duplicates
-    for hashtags in all_hashtags:
-        if hashtags not in unique_hashtags:
-            unique_hashtags += [hashtags]
-
-    return unique_hashtags
+    # must ensure there are no duplicates, keeping the first of each
+    return list(dict.fromkeys(extract_words(text, HASH_SYMBOL)))
     
     
+@_profiled('count_words', _text_size)
 def count_words(text: str, words_to_counts: Dict[str, int]) -> None:
     """Update or add new key-value pairs in words_to_counts based on the 
     freqeuncy of each word in text.
@@ -209,32 +657,30 @@ def count_words(text: str, words_to_counts: Dict[str, int]) -> None:
     True
     
     """
-    text1 = text.split()
-    text = text1[:]
-    # remove all mentions, hashtags and urls
-    for word in text1:
-        if (word.startswith(MENTION_SYMBOL) or word.startswith(HASH_SYMBOL) or \
-            word.startswith(URL_START)):
-            text.remove(word)
-            
-    # clean all words, no empty string
-    keys = []
-    for word in text:
-        cleaned_word = clean_word(word)
-        if cleaned_word != '':
-            keys += [cleaned_word.lower()]
-    
-    # loop over the keys, if new key in dictonary, set up key_value, else 
-    # update value
-    for key in keys:
-        # if key already in list, update that value
-        if key in words_to_counts:
-            words_to_counts[key] = words_to_counts[key] + 1
-        else:
-            # if key not in list, add it
-            words_to_counts[key] = 1
+    # tokenize skips all mentions, hashtags and urls, and words that clean
+    # to ''
+    add_counts(words_to_counts, Counter(tokenize(text).words))
+
+
+@_profiled('count_words_many', inner=('tokenize', 'tokenize'))
+def count_words_many(texts: Iterable[str], 
+                     words_to_counts: Dict[str, int]) -> None:
+    """Update words_to_counts the same way as calling count_words on each text
+    in texts in order, counting all of texts before updating words_to_counts.
+
+    >>> words = {'hi': 1}
+    >>> count_words_many(['Hi @you bye', 'bye! http://a.ca'], words)
+    >>> words
+    {'hi': 2, 'bye': 2}
+
+    """
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text).words)
+    add_counts(words_to_counts, counts)
 
 
+@_profiled('common_words')
 def common_words(words_to_counts: Dict[str, int], num: int) -> None:
     """Update words_to_counts so it has at most num amount of key-value pairs 
     based on highest frequency of words in words_to_count. If there is a tie
@@ -252,77 +698,268 @@ def common_words(words_to_counts: Dict[str, int], num: int) -> None:
     {}
     
     """
-    # get values list
-    counts_list = list(words_to_counts.values())
-    counts_list.sort()
-    counts_list.reverse()
-    # now counts goes from have highest to lowest frequencies
-    safe_list = []
-    
-    # choose num number of values to be in safe_list, since counts is properly 
-    # sorted they will be the highest values
-    for count in counts_list:
-        if len(safe_list) < num:
-            safe_list += [count] 
-    
-    # there was have been a tie for the num-th word if there are more count of 
-    # the last element in safe_list than in counts
-    if len(counts_list) > 0 and safe_list.count(safe_list[-1]) < \
-       counts_list.count(safe_list[-1]):
-        i = 0
-        last_element_count = safe_list.count(safe_list[-1]) 
-        while i < last_element_count:
-            safe_list.remove(safe_list[-1])
-            i += 1
-
-    # remove all keys whose values aren't in safe_list
-    words = list(words_to_counts.keys())
-    for word in words:
-        if words_to_counts[word] not in safe_list:
-            words_to_counts.pop(word)
-    
+    survivors = top_words(words_to_counts, num)
+    if len(survivors) < len(words_to_counts):
+        words_to_counts.clear()
+        words_to_counts.update(survivors)
+
+
+def top_words(words_to_counts: Dict[str, int], num: int) -> \
+    List[Tuple[str, int]]:
+    """Return the word-count pairs that common_words(words_to_counts, num)
+    would keep, in the order of words_to_counts, without changing
+    words_to_counts.
 
-def read_tweets(file: TextIO) -> Dict[str, List[tuple]]:
+    Only the num + 1 highest counts are found, using a heap, so this takes
+    O(V log num) time for V words instead of sorting every count.
+
+    Precondition: num > 0
+
+    >>> top_words({'hel': 5, 'he': 5, 'wag1': 4, 'yo': 3, '23': 3}, 4)
+    [('hel', 5), ('he', 5), ('wag1', 4)]
+    >>> top_words({'hel': 5, 'he': 4, 'wag1': 3, 'yo': 2}, 3)
+    [('hel', 5), ('he', 4), ('wag1', 3)]
+
+    """
+    if len(words_to_counts) <= num:
+        return list(words_to_counts.items())
+    largest = heapq.nlargest(num + 1, words_to_counts.values())
+    cutoff = largest[num - 1]
+    if largest[num] == cutoff:
+        # there is a tie for the num-th spot, so all words with that count are
+        # discarded
+        return [(word, count) for word, count in words_to_counts.items()
+                if count > cutoff]
+    return [(word, count) for word, count in words_to_counts.items()
+            if count >= cutoff]
+
+
+def _iter_sections(file: TextIO, 
+                   parser: '_TweetParser' = None) -> Iterator[tuple]:
+    """Yield (username, None) at the start of every user section in file and
+    (username, tweet) for every tweet, in file order, parsed by parser (a new
+    _TweetParser by default).
+
+    """
+    if parser is None:
+        parser = _TweetParser()
+    current = _profile.get()
+    if current is not None:
+        yield from _iter_sections_profiled(file, current, parser)
+        return
+    for line in file:
+        record = parser.feed(line)
+        if record is not None:
+            yield record
+
+
+def _iter_sections_profiled(file: TextIO, profile: 'Profile', 
+                            parser: '_TweetParser') -> Iterator[tuple]:
+    """Yield the same records as _iter_sections, recording in profile the
+    time spent reading lines, finding usernames and building tweets.
+
+    """
+    clock = time.perf_counter
+    read_time = boundary_time = build_time = 0.0
+    num_lines = num_bytes = num_users = num_tweets = 0
+    lines = iter(file)
+    while True:
+        start = clock()
+        line = next(lines, None)
+        read_end = clock()
+        read_time += read_end - start
+        if line is None:
+            break
+        is_username = parser.advance(line)
+        boundary_end = clock()
+        record = parser.take(line, is_username)
+        build_end = clock()
+        boundary_time += boundary_end - read_end
+        build_time += build_end - boundary_end
+        num_lines += 1
+        num_bytes += len(line.encode('utf-8'))
+        if record is not None:
+            if record[1] is None:
+                num_users += 1
+            else:
+                num_tweets += 1
+            yield record
+    profile.add('read', read_time, num_bytes, num_lines)
+    profile.add('find_usernames', boundary_time, records=num_users)
+    profile.add('build_tweets', build_time, records=num_tweets)
+
+
+def iter_tweets(file: TextIO) -> Iterator[Tuple[str, tuple]]:
+    """Yield a (username, tweet) pair for every tweet in file, in file order,
+    reading file in a single forward pass. Each tweet is a Tweet of (tweet
+    text, date, source, favourite count, retweet count). Duplicate tweets are
+    yielded too.
+
+    >>> from io import StringIO
+    >>> f = StringIO('UofT:\\n1,Home,Web,2,3\\nHi: #cats\\n<<<EOT\\n')
+    >>> list(iter_tweets(f)) == [('uoft', ('Hi: #cats', 1, 'Web', 2, 3))]
+    True
+
+    """
+    for username, tweet in _iter_sections(file):
+        if tweet is not None:
+            yield (username, tweet)
+
+
+def _tweet_key(date: int, source: bytes, text: bytes) -> bytes:
+    """Return a 16 byte digest identifying a tweet by its date, source and
+    text, encoded as bytes.
+
+    >>> _tweet_key(110, b'pop', b'#cat') == _tweet_key(110, b'pop', b'#cat')
+    True
+    >>> _tweet_key(110, b'pop', b'#cat') == _tweet_key(110, b'po', b'p#cat')
+    False
+
+    """
+    digest = hashlib.blake2b(b'%d,%d,' % (date, len(source)), digest_size=16)
+    digest.update(source)
+    digest.update(text)
+    return digest.digest()
+
+
+class TweetMerger:
+    """Collects user sections into a dictionary in the format returned by
+    read_tweets, joining the sections of a user that appears more than once
+    and dropping exact duplicate tweets.
+
+    A tweet is a duplicate if the same user already has a tweet with the same
+    date, source and text, in any section, and only the first copy is kept.
+    Each check is a set lookup of a fixed-size digest of the three, so the
+    texts themselves are not kept. The counts of sections, repeated sections,
+    tweets kept and duplicates dropped are a report of the merge.
+
+    >>> merger = TweetMerger()
+    >>> merger.update({'user1': [('#cat', 110, 'pop', 1, 2)]})
+    >>> merger.update({'user1': [('#cat', 110, 'pop', 1, 2), 
+    ...                          ('hi', 112, 'pop', 0, 4)]})
+    >>> len(merger.users_to_tweets['user1']), merger.duplicates
+    (2, 1)
+
+    """
+
+    def __init__(self) -> None:
+        self.users_to_tweets = {}
+        self.sections = 0
+        self.repeated_sections = 0
+        self.num_tweets = 0
+        self.duplicates = 0
+        # the _tweet_key of every tweet of each user
+        self._keys = {}
+
+    def add_user(self, username: str) -> bool:
+        """Start a section of username's tweets and return True iff username
+        is new.
+
+        """
+        self.sections += 1
+        tweets = self.users_to_tweets.get(username)
+        if tweets is None:
+            self.users_to_tweets[username] = []
+            self._keys[username] = set()
+            return True
+        self.repeated_sections += 1
+        return False
+
+    def check(self, username: str, tweet: tuple) -> bool:
+        """Return True and remember tweet by username if it is not a
+        duplicate, without adding it to users_to_tweets, or return False if
+        it is. This filters a stream of tweets without keeping them.
+
+        >>> merger = TweetMerger()
+        >>> [merger.check('user1', ('#cat', 110, 'pop', i, 2)) 
+        ...  for i in range(2)]
+        [True, False]
+
+        """
+        keys = self._keys.get(username)
+        if keys is None:
+            keys = set()
+            self._keys[username] = keys
+        key = _tweet_key(
+            tweet[TWEET_DATE_INDEX],
+            tweet[TWEET_SOURCE_INDEX].encode('utf-8', 'surrogatepass'),
+            tweet[TWEET_TEXT_INDEX].encode('utf-8', 'surrogatepass'))
+        if key in keys:
+            self.duplicates += 1
+            return False
+        keys.add(key)
+        self.num_tweets += 1
+        return True
+
+    def add_tweet(self, username: str, tweet: tuple) -> bool:
+        """Add tweet to the tweets of username, who must have been added, and
+        return True, or return False if it is a duplicate.
+
+        """
+        if not self.check(username, tweet):
+            return False
+        self.users_to_tweets[username].append(tweet)
+        return True
+
+    def extend(self, username: str, tweets: List[tuple]) -> None:
+        """Add each of tweets to the tweets of username, who must have been
+        added.
+
+        """
+        for tweet in tweets:
+            self.add_tweet(username, tweet)
+
+    def update(self, users_to_tweets: Dict[str, List[tuple]]) -> None:
+        """Add a section for each user in users_to_tweets, such as the result
+        of read_tweets for another file.
+
+        """
+        for username, tweets in users_to_tweets.items():
+            self.add_user(username)
+            self.extend(username, tweets)
+
+    def report(self) -> Dict[str, int]:
+        """Return the counts of the merge so far."""
+        return {'sections': self.sections, 
+                'repeated_sections': self.repeated_sections,
+                'tweets': self.num_tweets, 'duplicates': self.duplicates}
+
+
+@_profiled('read_tweets', inner=('read', 'build_tweets'))
+def read_tweets(file: TextIO, 
+                merger: TweetMerger = None) -> Dict[str, List[tuple]]:
     """Returns a dictionary where the keys are twitter usernames and the 
     values are the user's tweet history in file. Each tweet history is stored
-    in a tuple of (tweet text, date, source, favourite count, retweet count).
+    in a Tweet, a tuple of (tweet text, date, source, favourite count, retweet
+    count).
+
+    The tweets of a username that appears more than once are joined, without
+    exact duplicates, as described in TweetMerger. If merger is given, file
+    is added to its tweets, so reading several files into one merger merges
+    them and merger reports how many duplicates were dropped.
     
+    >>> from io import StringIO
+    >>> f = StringIO('UofT:\\nUTM:\\n1,Home,Web,2,3\\nHi\\n<<<EOT\\n')
+    >>> read_tweets(f) == {'uoft': [], 'utm': [('Hi', 1, 'Web', 2, 3)]}
+    True
+    >>> f = StringIO('UTM:\\n1,Home,Web,2,3\\nHi\\n<<<EOT\\n' * 2)
+    >>> read_tweets(f) == {'utm': [('Hi', 1, 'Web', 2, 3)]}
+    True
+
     """
-    lines = file.readlines()  
-    #only usernames always end in ':\n'
-    usernames = get_usernames(lines)
-    users_to_tweets = {}
-    # between two user names is all of the user's tweet history
-    for i in range(len(usernames)):
-        if usernames[i] == usernames[-1]:
-            users_tweets = lines[usernames[i]:]
-        else: 
-            users_tweets = lines[usernames[i]:usernames[i + 1]]
-        # dividing each tweet's information for the particular user
-        tweets_end = get_indexes(users_tweets, '<<<EOT\n')
-        tweet_list = []
-        start = 1
-        for j in tweets_end:
-            end = j
-            # extracting information from one tweet history
-            tweet_data = users_tweets[start:end]
-            # getting date, source, favourite count and retweet count 
-            tweet_info = tweet_data[0].split(',')
-            # getting text of tweet
-            tweet_text = ''
-            for k in range(1, len(tweet_data)):
-                tweet_text += tweet_data[k]
-            tweet_list += [(tweet_text.strip(),
-                            int(tweet_info[FILE_DATE_INDEX]), 
-                            tweet_info[FILE_SOURCE_INDEX], 
-                            int(tweet_info[FILE_FAVOURITE_INDEX]), 
-                            int(tweet_info[FILE_RETWEET_INDEX][:-1]))]
-            start = end + 1
-        # putting all information in dictonary where key is lowered username    
-        users_to_tweets[users_tweets[0][:-2].lower()] = tweet_list
-    return users_to_tweets
+    if merger is None:
+        merger = TweetMerger()
+    add_user = merger.add_user
+    add_tweet = merger.add_tweet
+    for username, tweet in _iter_sections(file):
+        if tweet is None:
+            add_user(username)
+        else:
+            add_tweet(username, tweet)
+    return merger.users_to_tweets
     
     
+@_profiled('most_popular')
 def most_popular(users_to_tweets: Dict[str, List[tuple]], start_date: int, 
                  end_date: int) -> str:
     """Return the username of the Twitter user in users_to_tweets who had the 
@@ -340,37 +977,77 @@ def most_popular(users_to_tweets: Dict[str, List[tuple]], start_date: int,
     'tie'
     
     """
-    #For each user
-    #get relevant tweets for each user
-    users_to_popularity = {}
-    for users in users_to_tweets:
-        
-        users_popularity = 0
-        #loop over add each sum to a user's dictionary
-        for tweets in users_to_tweets[users]:
-            if start_date <= tweets[TWEET_DATE_INDEX] <= end_date:
-                users_popularity += (tweets[TWEET_FAVOURITE_INDEX] + 
-                                     tweets[TWEET_RETWEET_INDEX])
-        users_to_popularity[users] = users_popularity
-    
-    #get values list and check how many times max occurs
-    popularity_values = list(users_to_popularity.values())
-
-    if len(popularity_values) == 0 or \
-       popularity_values.count(max(popularity_values)) > 1:
-        result = 'tie'
-    else:
-        result = find_key(users_to_popularity, max(popularity_values))
-           
-    return result
+    return popular_user(user_popularity(users_to_tweets, start_date, 
+                                        end_date))
   
 
+@_profiled('popularity_leaderboard')
+def popularity_leaderboard(users_to_tweets: Dict[str, List[tuple]], 
+                           start_date: int, end_date: int, 
+                           k: int) -> List[LeaderboardEntry]:
+    """Return the k users in users_to_tweets with the highest popularity
+    between start_date and end_date (inclusive), as a LeaderboardEntry for
+    each popularity from highest to lowest. Users with the same popularity
+    share an entry and a rank, and every user tied with the k-th user is
+    included, so the last entry may hold more than k users in total.
+
+    The first entry agrees with most_popular: it holds one user unless
+    most_popular returns 'tie'. users_to_tweets may also be a tweet
+    collection such as a TweetStore or PopularityIndex.
+
+    Precondition: end_date >= start_date and k > 0
+
+    >>> users = {'user1': [('1', 110, 'bop', 1, 1), ('1', 112, 'bop', 2, 2)],\
+    'user2': [('1', 110, 'bop', 2, 2)], 'user3': [('1', 110, 'bop', 4, 0)]}
+    >>> for entry in popularity_leaderboard(users, 109, 111, 2):
+    ...     print(entry.rank, entry.popularity, entry.usernames)
+    1 4 ['user2', 'user3']
+    >>> popularity_leaderboard(users, 100, 200, 2)[1]
+    LeaderboardEntry(rank=2, popularity=4, usernames=['user2', 'user3'])
+
+    """
+    users_to_popularity = user_popularity(users_to_tweets, start_date, 
+                                          end_date)
+
+    # heap holds the k highest (popularity, username) pairs seen so far, and
+    # tied the other users with the same popularity as the lowest of them
+    heap = []
+    tied = []
+    for username, total in users_to_popularity.items():
+        if len(heap) < k:
+            heapq.heappush(heap, (total, username))
+        elif total > heap[0][0]:
+            lowest, lowest_user = heapq.heapreplace(heap, (total, username))
+            if heap[0][0] == lowest:
+                tied.append(lowest_user)
+            else:
+                tied = []
+        elif total == heap[0][0]:
+            tied.append(username)
+    if tied:
+        cutoff = heap[0][0]
+        heap.extend((cutoff, username) for username in tied)
+
+    entries = []
+    rank = 1
+    for total, username in sorted(heap, key=lambda pair: (-pair[0], pair[1])):
+        if entries and entries[-1].popularity == total:
+            entries[-1].usernames.append(username)
+        else:
+            if entries:
+                rank += len(entries[-1].usernames)
+            entries.append(LeaderboardEntry(rank, total, [username]))
+    return entries
+
+
+@_profiled('detect_author')
 def detect_author(users_to_tweets: Dict[str, List[tuple]], tweet_text: str) -> \
     str:
     """ Return the username of the most likely author of tweet_text, based on
     the hashtags they use in users_to_tweets. If all hashtags in tweet_text are 
     only used by a single user, then return that user's username. Otherwise,
-    return the string 'unknown'.
+    return the string 'unknown'. To attribute many tweets, pass a HashtagIndex
+    of users_to_tweets instead, so it is only built once.
     
     >>> detect_author({'user1': [('#cat rat#', 1, 'pop', 1, 1 ), \
     ('#dog doggy', 1, 'hop', 0, 0)], 'user2': [('#cat', 1, 'dop', 0, 0)]}, \
@@ -381,41 +1058,2152 @@ def detect_author(users_to_tweets: Dict[str, List[tuple]], tweet_text: str) -> \
     'unknown'
     
     """
-    users_to_hashtags = {}
-    wanted_hashtags = extract_hashtags(tweet_text)
-    wanted_hashtags.sort()
-    
-    # Get all hashtags and pair them with their respective users
-    for users in users_to_tweets:
-        all_tweet_text = ''
-        for tweets in users_to_tweets[users]:
-                all_tweet_text += (tweets[TWEET_TEXT_INDEX] + ' ')               
-        users_to_hashtags[users] = extract_hashtags(all_tweet_text)
-
-    # Revome all hashtags for all users in users_to_hashtags that aren't in 
-    # wanted_hashtags
-    for users in users_to_hashtags:
-        updated_hashtags = []
-        for hashtags in users_to_hashtags[users]:
-            if hashtags in wanted_hashtags:
-                updated_hashtags += [hashtags]
-        updated_hashtags.sort()
-        users_to_hashtags[users] = updated_hashtags
-
-    users_hashtags_list = list(users_to_hashtags.values())
-    
-    # There should only be one non-empty hashtags_list and that should have 
-    # same value as wanted_hashtags and since they are sorted order 
-    # shouldn't matter
-    if ((users_hashtags_list.count([]) == len(users_hashtags_list) - 1) and \
-        (users_hashtags_list.count(wanted_hashtags) == 1)):
-        return find_key(users_to_hashtags, wanted_hashtags)
-    else:
-        return 'unknown'
+    if not isinstance(users_to_tweets, HashtagIndex):
+        users_to_tweets = HashtagIndex.from_dict(users_to_tweets)
+    return users_to_tweets.detect(tweet_text)
 
 
-if __name__ == '__main__':
-    pass
+# Streaming word counts
+
+class WordCounter:
+    """Word counts of a stream of texts, counted the same way as count_words.
+
+    With no capacity the counts are exact. With a capacity, at most that many
+    words are kept, using the Space-Saving algorithm: when a new word arrives
+    and the counter is full, the word with the lowest count is replaced and
+    the new word inherits that count as its possible error. Every kept count
+    is then at most errors[word] above the true count, and every word whose
+    true count is above total / capacity is kept. A capacity must be
+    positive, or ValueError is raised.
+
+    """
+
+    def __init__(self, capacity: int = None) -> None:
+        if capacity is not None and capacity <= 0:
+            raise ValueError('capacity must be positive, not {}'.format(
+                capacity))
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # one (count, word) entry per kept word, with counts that may be lower
+        # than the word's current count
+        self._heap = []
+
+    def update(self, text: str) -> None:
+        """Count the words in text.
+
+        >>> counter = WordCounter(capacity=2)
+        >>> counter.update('a b a c a')
+        >>> counter.counts, counter.errors
+        ({'a': 3, 'c': 2}, {'a': 0, 'c': 1})
+
+        """
+        self.update_counts(Counter(tokenize(text).words))
+
+    def update_counts(self, counts: Dict[str, int]) -> None:
+        """Add the word counts in counts."""
+        if self.capacity is None:
+            self.total += sum(counts.values())
+            add_counts(self.counts, counts)
+            return
+        for word, count in counts.items():
+            self.total += count
+            if word in self.counts:
+                self.counts[word] += count
+            elif len(self.counts) < self.capacity:
+                self.counts[word] = count
+                self.errors[word] = 0
+                heapq.heappush(self._heap, (count, word))
+            else:
+                lowest, evicted = self._pop_lowest()
+                del self.counts[evicted]
+                del self.errors[evicted]
+                self.counts[word] = lowest + count
+                self.errors[word] = lowest
+                heapq.heappush(self._heap, (lowest + count, word))
+
+    def _pop_lowest(self) -> Tuple[int, str]:
+        """Remove and return the (count, word) entry with the lowest count."""
+        heap = self._heap
+        while heap[0][0] != self.counts[heap[0][1]]:
+            # the word was counted again since its entry was added
+            heapq.heapreplace(heap, (self.counts[heap[0][1]], heap[0][1]))
+        return heapq.heappop(heap)
+
+    def error_bound(self) -> int:
+        """Return the most any count can be above the true count.
+
+        >>> counter = WordCounter(capacity=2)
+        >>> counter.update('a b a c a d')
+        >>> counter.error_bound() <= counter.total // counter.capacity
+        True
+
+        """
+        if self.capacity is None or len(self.counts) < self.capacity:
+            return 0
+        return max(self.errors.values())
+
+    def common_words(self, num: int) -> Dict[str, int]:
+        """Return the words and counts common_words(counts, num) would keep
+        for the counts of this counter.
+
+        Precondition: num > 0
+
+        """
+        return dict(top_words(self.counts, num))
+
+
+# Incremental updates
+
+class TweetState:
+    """Tweets read so far from a growing tweet file or stream of tweets, with
+    indexes that are kept up to date as tweets are appended.
+
+    users_to_tweets is in the same format as read_tweets. Every tweet is
+    checked for duplicates, which are dropped before they reach the indexes,
+    and merger reports how many were dropped. Any TweetRollups in rollups are
+    kept up to date too.
+
+    """
+
+    def __init__(self, path: str = None, encoding: str = 'utf-8', 
+                 rollups: Iterable['TweetRollup'] = ()) -> None:
+        self.path = path
+        self.encoding = encoding
+        self.rollups = list(rollups)
+        # the number of bytes of the file at path parsed so far
+        self.offset = 0
+        self.merger = TweetMerger()
+        self.users_to_tweets = self.merger.users_to_tweets
+        self.hashtags = HashtagIndex()
+        self.popularity = PopularityIndex()
+        self.words = WordCounter()
+        self._parser = _TweetParser()
+
+    def add_user(self, username: str) -> None:
+        """Start a section of username's tweets, adding username with no
+        tweets if they are not known yet.
+
+        """
+        if self.merger.add_user(username):
+            self.hashtags.usernames.add(username)
+            self.popularity.add_user(username)
+            for rollup in self.rollups:
+                rollup.add_user(username)
+
+    def add_tweet(self, username: str, tweet: tuple) -> bool:
+        """Add tweet by username and update every index, and return True, or
+        return False if it is a duplicate.
+
+        """
+        if username not in self.users_to_tweets:
+            self.add_user(username)
+        if not self.merger.add_tweet(username, tweet):
+            return False
+        self.hashtags.add_tweet(username, tweet)
+        self.popularity.append(username, tweet)
+        self.words.update(tweet[TWEET_TEXT_INDEX])
+        for rollup in self.rollups:
+            rollup.add_tweet(username, tweet)
+        return True
+
+    def add_record(self, username: str, tweet: Optional[tuple]) -> bool:
+        """Add a (username, None) or (username, tweet) record as parsed from a
+        tweet file, and return True iff a tweet was added.
+
+        """
+        if tweet is None:
+            self.add_user(username)
+            return False
+        return self.add_tweet(username, tweet)
+
+
+def append_tweets(state: TweetState, 
+                  source: Iterable[Tuple[str, tuple]] = None) -> int:
+    """Add new tweets to state and return how many were added, not counting
+    duplicates.
+
+    If source is None, the part of the file at state.path after state.offset
+    is parsed. Only complete lines are read, and a tweet that is not
+    finished yet is completed by a later call. Otherwise source is an
+    iterable of (username, tweet) pairs such as iter_tweets returns.
+
+    >>> state = TweetState()
+    >>> append_tweets(state, [('user1', ('#cat', 110, 'pop', 1, 2))])
+    1
+    >>> append_tweets(state, [('user1', ('#dog cat', 112, 'pop', 0, 4))])
+    1
+    >>> state.popularity.user_popularity('user1', 0, 200), state.words.counts
+    (7, {'cat': 1})
+
+    """
+    added = 0
+    if source is not None:
+        for username, tweet in source:
+            added += state.add_tweet(username, tweet)
+        return added
+
+    with open(state.path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < state.offset:
+            raise ValueError('{} is shorter than the {} bytes already read'
+                             .format(state.path, state.offset))
+        file.seek(state.offset)
+        for line in file:
+            if not line.endswith(b'\n'):
+                # the rest of this line hasn't been written yet
+                break
+            state.offset += len(line)
+            line = line.decode(state.encoding).replace('\r\n', '\n')
+            record = state._parser.feed(line)
+            if record is not None:
+                added += state.add_record(*record)
+    return added
+
+
+# Asynchronous ingestion
+
+class TweetPipeline:
+    """Parses tweets from an asyncio.StreamReader as bytes arrive and pushes
+    them to consumers.
+
+    Each consumer is called as consumer(username, tweet) for every tweet and
+    as consumer(username, None) at the start of every user section, in file
+    order, and may be a coroutine function. A consumer reads from its own
+    queue of at most queue_size batches of records, so when a consumer falls
+    behind, reading waits for it and the stream's own flow control pauses the
+    sender.
+
+    """
+
+    def __init__(self, queue_size: int = 16, 
+                 chunk_size: int = 1 << 16) -> None:
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.consumers = []
+
+    def add_consumer(self, consumer: Callable[[str, Optional[tuple]], 
+                                              object]) -> None:
+        """Push every record read by later calls of run to consumer."""
+        self.consumers.append(consumer)
+
+    async def run(self, reader: 'asyncio.StreamReader', 
+                  encoding: str = 'utf-8') -> int:
+        """Read reader to the end, pushing its records to every consumer, and
+        return the number of tweets read once every consumer has processed
+        them.
+
+        """
+        # imported here since only async callers need asyncio
+        import asyncio
+        queues = [asyncio.Queue(self.queue_size) for _ in self.consumers]
+        tasks = [asyncio.ensure_future(self._consume(consumer, queue))
+                 for consumer, queue in zip(self.consumers, queues)]
+        producer = asyncio.ensure_future(self._produce(reader, encoding, 
+                                                       queues))
+        try:
+            await asyncio.gather(producer, *tasks)
+        except BaseException:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+            raise
+        return producer.result()
+
+    async def _produce(self, reader: 'asyncio.StreamReader', encoding: str, 
+                       queues: List['asyncio.Queue']) -> int:
+        """Parse reader, putting each chunk's records in every queue and None
+        at the end, and return the number of tweets read.
+
+        """
+        parser = _TweetParser()
+        pending = bytearray()
+        num_tweets = 0
+        while True:
+            data = await reader.read(self.chunk_size)
+            pending += data
+            if data:
+                # only whole lines are decoded, so multi-byte characters
+                # split between reads are decoded together
+                end = pending.rfind(b'\n') + 1
+            else:
+                end = len(pending)
+            if end:
+                text = pending[:end].decode(encoding).replace('\r\n', '\n')
+                del pending[:end]
+                lines = text.split('\n')
+                last = lines.pop()
+                batch = []
+                for line in lines:
+                    record = parser.feed(line + '\n')
+                    if record is not None:
+                        batch.append(record)
+                if last:
+                    # the final line of a stream without a newline at the end
+                    record = parser.feed(last)
+                    if record is not None:
+                        batch.append(record)
+                num_tweets += sum(tweet is not None for _, tweet in batch)
+                if batch:
+                    for queue in queues:
+                        await queue.put(batch)
+            if not data:
+                for queue in queues:
+                    await queue.put(None)
+                return num_tweets
+
+    async def _consume(self, consumer: Callable[[str, Optional[tuple]], 
+                                                object], 
+                       queue: 'asyncio.Queue') -> None:
+        """Call consumer on the records in queue until it gets None."""
+        # imported here since only async callers need inspect
+        import inspect
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            for username, tweet in batch:
+                result = consumer(username, tweet)
+                if inspect.isawaitable(result):
+                    await result
+
 
-    #import doctest
-    #doctest.testmod()
+async def read_tweets_async(reader: 'asyncio.StreamReader', 
+                            encoding: str = 'utf-8', 
+                            merger: TweetMerger = None) -> \
+    Dict[str, List[tuple]]:
+    """Return the same dictionary as read_tweets for the tweet file read from
+    reader. If merger is given, the tweets are added to it as in read_tweets.
+
+    >>> import asyncio
+    >>> async def example():
+    ...     reader = asyncio.StreamReader()
+    ...     reader.feed_data(b'UofT:\\nUTM:\\n1,Home,Web,2,3\\nHi\\n<<<EOT\\n')
+    ...     reader.feed_eof()
+    ...     return await read_tweets_async(reader)
+    >>> asyncio.run(example()) == {'uoft': [], 'utm': [('Hi', 1, 'Web', 2, 3)]}
+    True
+
+    """
+    if merger is None:
+        merger = TweetMerger()
+
+    def add(username: str, tweet: Optional[tuple]) -> None:
+        if tweet is None:
+            merger.add_user(username)
+        else:
+            merger.add_tweet(username, tweet)
+
+    pipeline = TweetPipeline()
+    pipeline.add_consumer(add)
+    await pipeline.run(reader, encoding)
+    return merger.users_to_tweets
+
+
+# Parallel parsing
+
+# files are split into chunks of about this many bytes for read_tweets_parallel
+PARALLEL_CHUNK_SIZE = 1 << 26
+
+
+def _chunk_bounds(path: str, chunk_size: int) -> List[Tuple[int, int]]:
+    """Return (start, end) byte offsets splitting the file at path into
+    chunks of about chunk_size bytes. Every chunk but the last ends right
+    after a line that is exactly END_OF_TWEET.
+
+    """
+    size = os.path.getsize(path)
+    boundary = ('\n' + END_OF_TWEET).encode()
+    starts = [0]
+    with open(path, 'rb') as file:
+        target = chunk_size
+        while target < size:
+            file.seek(target)
+            data = file.read(chunk_size)
+            found = data.find(boundary)
+            while found == -1 and len(data) < size - target:
+                # the boundary may be in the next block, or span two blocks
+                data += file.read(chunk_size)
+                found = data.find(boundary)
+            if found == -1:
+                break
+            starts.append(target + found + len(boundary))
+            target = starts[-1] + chunk_size
+    ends = starts[1:] + [size]
+    return [(start, end) for start, end in zip(starts, ends) if start < end]
+
+
+@_profiled('parse_chunk', inner=('read', 'build_tweets'))
+def _parse_chunk(path: str, start: int, end: int, 
+                 profiled: bool = False) -> List[tuple]:
+    """Return the user sections in bytes start to end of the file at path as
+    a list of (username, tweets) pairs. If the chunk starts with tweets of a
+    user from an earlier chunk, the first username is None.
+
+    If profiled is True, return the sections and the stages of a Profile of
+    the call instead, for a worker process to send back.
+
+    """
+    if profiled:
+        with profile() as stats:
+            sections = _parse_chunk(path, start, end)
+        return sections, stats.stages
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    # decode the same way open(path) does for read_tweets
+    lines = io.TextIOWrapper(io.BytesIO(data))
+    sections = []
+    for username, tweet in _iter_sections(
+            lines, _TweetParser(after_eot=start > 0)):
+        if tweet is None:
+            sections.append((username, []))
+        else:
+            if len(sections) == 0:
+                sections.append((None, []))
+            sections[-1][1].append(tweet)
+    return sections
+
+
+def _read_file_parallel(path: str, chunks: List[List[tuple]], 
+                        merger: TweetMerger) -> None:
+    """Add the tweets of the file at path to merger as read_tweets does,
+    given the sections of each of its chunks in order.
+
+    """
+    sections = [section for chunk in chunks for section in chunk]
+    if sections and sections[0][0] is None:
+        # tweets before any username are parsed differently when the whole
+        # file is read at once, so fall back to that
+        with open(path) as file:
+            read_tweets(file, merger)
+        return
+    current = None
+    for username, tweets in sections:
+        if username is not None:
+            merger.add_user(username)
+            current = username
+        merger.extend(current, tweets)
+
+
+@_profiled('read_tweets_parallel', inner=('read', 'build_tweets'))
+def read_tweets_parallel(paths: List[str], workers: int = None, 
+                         chunk_size: int = PARALLEL_CHUNK_SIZE, 
+                         merger: TweetMerger = None) -> \
+    Dict[str, List[tuple]]:
+    """Return the tweets in the files at paths, read by up to workers
+    processes (one per CPU by default). Each file is split into chunks of
+    about chunk_size bytes at tweet boundaries, so a single big file is also
+    parsed in parallel.
+
+    Each file gives the same dictionary as read_tweets, and a user's tweets
+    from several files are joined in the order of paths without duplicates.
+    If merger is given, the tweets are added to it as in read_tweets.
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    tasks = []
+    file_numbers = []
+    for i in range(len(paths)):
+        for start, end in _chunk_bounds(paths[i], chunk_size):
+            tasks.append((paths[i], start, end))
+            file_numbers.append(i)
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [_parse_chunk(*task) for task in tasks]
+    else:
+        # imported here since most callers never need a process pool
+        from concurrent.futures import ProcessPoolExecutor
+        current = _profile.get()
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_parse_chunk, *zip(*tasks), 
+                                        [current is not None] * len(tasks)))
+        if current is not None:
+            # the workers profile their chunks and send back the stages
+            for sections, stages in results:
+                current.merge(stages)
+            results = [sections for sections, stages in results]
+
+    files_to_chunks = [[] for path in paths]
+    for i, sections in zip(file_numbers, results):
+        files_to_chunks[i].append(sections)
+
+    if merger is None:
+        merger = TweetMerger()
+    for i in range(len(paths)):
+        _read_file_parallel(paths[i], files_to_chunks[i], merger)
+    return merger.users_to_tweets
+
+
+# Memory-mapped tweet files
+
+class TweetFile:
+    """A tweet file that is memory-mapped instead of read into memory.
+
+    Opening a TweetFile scans the bytes of the file once for the end of each
+    tweet and keeps, for every username, an array of (start, end) byte offset
+    pairs of that user's tweets. The text and metadata of a tweet are only
+    decoded when they are accessed. The file must use '\\n' line endings.
+
+    Repeated users are merged as read_tweets does, and duplicates is the
+    number of duplicate tweets dropped.
+
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8') -> None:
+        self.path = path
+        self.encoding = encoding
+        self.duplicates = 0
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            # an empty file can't be memory-mapped
+            self._buffer = b''
+        else:
+            self._buffer = mmap.mmap(self._file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        self._offsets = self._index()
+
+    def close(self) -> None:
+        """Release the memory map and close the file."""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'TweetFile':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _index(self) -> Dict[str, array]:
+        """Return the offsets of every user's tweets in the file, following
+        the same rules for usernames as read_tweets.
+
+        """
+        buf = self._buffer
+        size = len(buf)
+        offsets = {}
+        username_end = USERNAME_END.encode()
+        end_of_tweet = END_OF_TWEET.encode()
+
+        # the keys of the tweets of each user, as in TweetMerger
+        users_to_keys = {}
+
+        # lines before the first username are ignored
+        pos = 0
+        current = None
+        while current is None:
+            line_end = buf.find(b'\n', pos)
+            if line_end == -1:
+                return offsets
+            if buf[line_end - 1:line_end + 1] == username_end:
+                username = self._decode(pos, line_end - 1).lower()
+                current = array('Q')
+                offsets[username] = current
+                keys = set()
+                users_to_keys[username] = keys
+            pos = line_end + 1
+
+        user_allowed = True
+        while pos < size:
+            line_end = buf.find(b'\n', pos)
+            if line_end == -1:
+                break
+            if user_allowed and \
+               buf[line_end - 1:line_end + 1] == username_end:
+                username = self._decode(pos, line_end - 1).lower()
+                current = offsets.get(username)
+                if current is None:
+                    current = array('Q')
+                    offsets[username] = current
+                    users_to_keys[username] = set()
+                keys = users_to_keys[username]
+                pos = line_end + 1
+                continue
+
+            eot = buf.find(end_of_tweet, pos)
+            if eot == -1:
+                break
+            # the tweet ends at the start of the line ending in END_OF_TWEET
+            end = buf.rfind(b'\n', pos, eot) + 1
+            if end > pos:
+                key = self._key(pos, end)
+                if key in keys:
+                    self.duplicates += 1
+                else:
+                    keys.add(key)
+                    current.append(pos)
+                    current.append(end)
+            pos = eot + len(end_of_tweet)
+            # only an exact END_OF_TWEET line may be followed by a username
+            user_allowed = eot == 0 or buf[eot - 1] == ord('\n')
+        return offsets
+
+    def _decode(self, start: int, end: int) -> str:
+        """Return the bytes of the file from start to end as a str."""
+        return self._buffer[start:end].decode(self.encoding)
+
+    def usernames(self) -> List[str]:
+        """Return the usernames in the file, in file order."""
+        return list(self._offsets)
+
+    def count(self, username: str) -> int:
+        """Return the number of tweets of username."""
+        return len(self._offsets[username]) // 2
+
+    def _info(self, start: int) -> Tuple[int, List[bytes]]:
+        """Return the offset of the end of the metadata line of the tweet
+        starting at start, and the fields of that line.
+
+        """
+        info_end = self._buffer.find(b'\n', start)
+        return info_end, self._buffer[start:info_end].split(b',')
+
+    def _key(self, start: int, end: int) -> bytes:
+        """Return the _tweet_key of the tweet from start to end, hashing the
+        bytes of its text without decoding them.
+
+        """
+        info_end, info = self._info(start)
+        text = self._buffer[info_end + 1:end].strip()
+        # bytes.strip only strips ASCII whitespace, but str.strip also strips
+        # \x1c-\x1f and non-ASCII spaces, so only then decode to strip
+        if text and (0x1c <= text[0] <= 0x1f or text[0] >= 0x80 or 
+                     0x1c <= text[-1] <= 0x1f or text[-1] >= 0x80):
+            text = text.decode(self.encoding).strip().encode(self.encoding)
+        return _tweet_key(int(info[FILE_DATE_INDEX]), info[FILE_SOURCE_INDEX],
+                          text)
+
+    def tweet_text(self, username: str, i: int) -> str:
+        """Return the text of the i-th tweet of username."""
+        offsets = self._offsets[username]
+        start, end = offsets[2 * i], offsets[2 * i + 1]
+        info_end = self._buffer.find(b'\n', start)
+        return self._decode(info_end + 1, end).strip()
+
+    def tweet(self, username: str, i: int) -> tuple:
+        """Return the i-th tweet of username as a tuple of (tweet text, date,
+        source, favourite count, retweet count).
+
+        """
+        offsets = self._offsets[username]
+        start = offsets[2 * i]
+        info_end, info = self._info(start)
+        return Tweet(self.tweet_text(username, i),
+                     int(info[FILE_DATE_INDEX]),
+                     sys.intern(info[FILE_SOURCE_INDEX].decode(self.encoding)),
+                     int(info[FILE_FAVOURITE_INDEX]),
+                     int(info[FILE_RETWEET_INDEX]))
+
+    def tweets(self, username: str) -> List[tuple]:
+        """Return all tweets of username, in file order."""
+        return [self.tweet(username, i) for i in range(self.count(username))]
+
+    def to_dict(self) -> Dict[str, List[tuple]]:
+        """Return the same dictionary as read_tweets would for the file."""
+        return {username: self.tweets(username) for username in self._offsets}
+
+    def user_texts(self) -> Iterator[Tuple[str, List[str]]]:
+        """Yield each username with the texts of their tweets."""
+        for username in self._offsets:
+            yield (username, [self.tweet_text(username, i) 
+                              for i in range(self.count(username))])
+
+    def popularity(self, start_date: int, end_date: int) -> Dict[str, int]:
+        """Return the popularity of every user between start_date and end_date
+        (inclusive), reading only the metadata of each tweet.
+
+        """
+        users_to_popularity = {}
+        for username, offsets in self._offsets.items():
+            users_popularity = 0
+            for j in range(0, len(offsets), 2):
+                info = self._info(offsets[j])[1]
+                if start_date <= int(info[FILE_DATE_INDEX]) <= end_date:
+                    users_popularity += (int(info[FILE_FAVOURITE_INDEX]) +
+                                         int(info[FILE_RETWEET_INDEX]))
+            users_to_popularity[username] = users_popularity
+        return users_to_popularity
+
+
+# Columnar tweet storage
+
+class TweetStore:
+    """Tweets stored column by column instead of as one tuple per tweet.
+
+    Row i of every column describes one tweet. The rows of each user are
+    stored together, in tweet order, and the users in the order of the
+    dictionary the store was built from. Sources are stored as numbers into
+    the list sources, and locations as numbers into the list locations, and
+    all tweet texts are concatenated into one str with the offset of each
+    tweet's text in text_offsets.
+
+    The numeric columns are arrays, so they take 8 bytes (4 for user ids and
+    source numbers) per tweet and can be shared with other libraries through
+    the buffer protocol.
+
+    """
+
+    def __init__(self) -> None:
+        self.usernames = []
+        # the rows of user number u are user_starts[u] to user_starts[u + 1]
+        self.user_starts = array('Q', [0])
+        self.user_ids = array('I')
+        self.dates = array('q')
+        self.favourites = array('q')
+        self.retweets = array('q')
+        self.sources = []
+        self.source_codes = array('I')
+        self.locations = []
+        self.location_codes = array('I')
+        self.text = ''
+        self.text_offsets = array('Q', [0])
+        # (dates, user ids, popularity) of all rows sorted by date, built on
+        # first use by date_sorted
+        self._date_sorted = None
+        # the rows of each location, built on first use by location_rows
+        self._location_rows = None
+
+    @classmethod
+    def from_dict(cls, users_to_tweets: Dict[str, List[tuple]], 
+                  users_to_locations: Dict[str, List[str]] = None) -> \
+        'TweetStore':
+        """Return a TweetStore with the tweets in users_to_tweets.
+        users_to_locations has the location of each of those tweets, in the
+        same order, and raises ValueError if a user has a different number of
+        locations than tweets. Without it every location is ''.
+
+        >>> store = TweetStore.from_dict({'user1': [('#cat', 110, 'pop', 1, \
+        2), ('hi', 112, 'pop', 0, 4)], 'user2': []})
+        >>> len(store), store.sources, list(store.user_starts)
+        (2, ['pop'], [0, 2, 2])
+
+        """
+        store = cls()
+        sources_to_codes = {}
+        locations_to_codes = {}
+        texts = []
+        text_end = 0
+        for username, tweets in users_to_tweets.items():
+            user_id = len(store.usernames)
+            store.usernames.append(username)
+            if users_to_locations is None:
+                locations = [''] * len(tweets)
+            else:
+                locations = users_to_locations[username]
+                if len(locations) != len(tweets):
+                    raise ValueError('{} has {} tweets but {} locations'.format(
+                        username, len(tweets), len(locations)))
+            for tweet, location in zip(tweets, locations):
+                source = tweet[TWEET_SOURCE_INDEX]
+                if source not in sources_to_codes:
+                    sources_to_codes[source] = len(store.sources)
+                    store.sources.append(source)
+                if location not in locations_to_codes:
+                    locations_to_codes[location] = len(store.locations)
+                    store.locations.append(location)
+                store.location_codes.append(locations_to_codes[location])
+                store.user_ids.append(user_id)
+                store.dates.append(tweet[TWEET_DATE_INDEX])
+                store.favourites.append(tweet[TWEET_FAVOURITE_INDEX])
+                store.retweets.append(tweet[TWEET_RETWEET_INDEX])
+                store.source_codes.append(sources_to_codes[source])
+                texts.append(tweet[TWEET_TEXT_INDEX])
+                text_end += len(tweet[TWEET_TEXT_INDEX])
+                store.text_offsets.append(text_end)
+            store.user_starts.append(len(store.dates))
+        store.text = ''.join(texts)
+        return store
+
+    @classmethod
+    def from_file(cls, file: TextIO, merger: 'TweetMerger' = None) -> \
+        'TweetStore':
+        """Return a TweetStore with the tweets read_tweets(file, merger) would
+        return, keeping the location of each tweet. merger must not hold any
+        tweets yet, since their locations are unknown.
+
+        >>> from io import StringIO
+        >>> store = TweetStore.from_file(StringIO('UofT:\\n1,Home,Web,2,3\\n'
+        ...                                       'Hi\\n<<<EOT\\n'))
+        >>> store.locations, store.location_of(0)
+        (['Home'], 'Home')
+
+        """
+        if merger is None:
+            merger = TweetMerger()
+        elif merger.num_tweets > 0:
+            raise ValueError('merger already holds {} tweets with unknown '
+                             'locations'.format(merger.num_tweets))
+        users_to_locations = {username: [] 
+                              for username in merger.users_to_tweets}
+        parser = _TweetParser()
+        for line in file:
+            record = parser.feed(line)
+            if record is None:
+                continue
+            username, tweet = record
+            if tweet is None:
+                merger.add_user(username)
+                users_to_locations.setdefault(username, [])
+            elif merger.add_tweet(username, tweet):
+                info = parser.info_line.split(',')
+                users_to_locations[username].append(
+                    sys.intern(info[FILE_LOCATION_INDEX]))
+        return cls.from_dict(merger.users_to_tweets, users_to_locations)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def text_of(self, row: int) -> str:
+        """Return the text of the tweet in row."""
+        return self.text[self.text_offsets[row]:self.text_offsets[row + 1]]
+
+    def tweet(self, row: int) -> tuple:
+        """Return the tweet in row as a tuple of (tweet text, date, source,
+        favourite count, retweet count).
+
+        """
+        return Tweet(self.text_of(row), self.dates[row],
+                     self.sources[self.source_codes[row]], 
+                     self.favourites[row], self.retweets[row])
+
+    def location_of(self, row: int) -> str:
+        """Return the location of the tweet in row."""
+        return self.locations[self.location_codes[row]]
+
+    def user_rows(self, user_id: int) -> range:
+        """Return the rows of the tweets of user number user_id."""
+        return range(self.user_starts[user_id], self.user_starts[user_id + 1])
+
+    def to_dict(self) -> Dict[str, List[tuple]]:
+        """Return the tweets in the store in the same format as read_tweets.
+
+        >>> users = {'user1': [('#cat', 110, 'pop', 1, 2)], 'user2': []}
+        >>> TweetStore.from_dict(users).to_dict() == users
+        True
+
+        """
+        return {username: [self.tweet(row) for row in self.user_rows(user_id)]
+                for user_id, username in enumerate(self.usernames)}
+
+    def user_texts(self) -> Iterator[Tuple[str, List[str]]]:
+        """Yield each username with the texts of their tweets."""
+        for user_id, username in enumerate(self.usernames):
+            rows = self.user_rows(user_id)
+            yield (username, [self.text_of(row) for row in rows])
+
+    def date_sorted(self) -> Tuple[array, array, array]:
+        """Return the dates, user ids and popularity (favourite count plus
+        retweet count) of all rows, sorted by date.
+
+        """
+        if self._date_sorted is None:
+            dates = self.dates
+            order = sorted(range(len(dates)), key=dates.__getitem__)
+            self._date_sorted = (
+                array('q', [dates[row] for row in order]),
+                array('I', [self.user_ids[row] for row in order]),
+                array('q', [self.favourites[row] + self.retweets[row]
+                            for row in order]))
+        return self._date_sorted
+
+    def popularity(self, start_date: int, end_date: int) -> Dict[str, int]:
+        """Return the popularity of every user between start_date and end_date
+        (inclusive). Only the rows in the date range are visited.
+
+        >>> store = TweetStore.from_dict({'user1': [('#cat', 110, 'pop', 1, \
+        2), ('hi', 112, 'pop', 0, 4)], 'user2': []})
+        >>> store.popularity(109, 111)
+        {'user1': 3, 'user2': 0}
+
+        """
+        dates, user_ids, popularity = self.date_sorted()
+        totals = [0] * len(self.usernames)
+        for row in range(bisect_left(dates, start_date), 
+                         bisect_right(dates, end_date)):
+            totals[user_ids[row]] += popularity[row]
+        return dict(zip(self.usernames, totals))
+
+    def location_rows(self, location: str) -> array:
+        """Return the rows of the tweets from location, in row order.
+
+        >>> store = TweetStore.from_dict({'user1': [('#cat', 110, 'pop', 1, \
+        2), ('hi', 112, 'pop', 0, 4)]}, {'user1': ['Home', 'Away']})
+        >>> list(store.location_rows('Away')), list(store.location_rows('Sea'))
+        ([1], [])
+
+        """
+        if self._location_rows is None:
+            rows = [array('I') for _ in self.locations]
+            for row, code in enumerate(self.location_codes):
+                rows[code].append(row)
+            self._location_rows = dict(zip(self.locations, rows))
+        return self._location_rows.get(location, array('I'))
+
+    def location_tweets(self, location: str) -> List[tuple]:
+        """Return the tweets from location, in row order."""
+        return [self.tweet(row) for row in self.location_rows(location)]
+
+    def location_popularity(self, location: str, start_date: int, 
+                            end_date: int) -> Dict[str, int]:
+        """Return the popularity of every user from their tweets from
+        location between start_date and end_date (inclusive). Only the rows
+        of the location are visited.
+
+        >>> store = TweetStore.from_dict({'user1': [('#cat', 110, 'pop', 1, \
+        2), ('hi', 112, 'pop', 0, 4)], 'user2': [('yo', 111, 'pop', 5, 0)]}, \
+        {'user1': ['Home', 'Away'], 'user2': ['Away']})
+        >>> store.location_popularity('Away', 100, 200)
+        {'user1': 4, 'user2': 5}
+
+        """
+        totals = [0] * len(self.usernames)
+        dates = self.dates
+        for row in self.location_rows(location):
+            if start_date <= dates[row] <= end_date:
+                totals[self.user_ids[row]] += (self.favourites[row] + 
+                                               self.retweets[row])
+        return dict(zip(self.usernames, totals))
+
+    def location_hashtags(self, location: str, num: int) -> Dict[str, int]:
+        """Return the hashtags of the tweets from location with the number of
+        tweets using each, keeping those common_words would keep for num.
+
+        Precondition: num > 0
+
+        """
+        counts = Counter()
+        for row in self.location_rows(location):
+            counts.update(extract_hashtags(self.text_of(row)))
+        return dict(top_words(counts, num))
+
+    def location_words(self, location: str, num: int) -> Dict[str, int]:
+        """Return the words of the tweets from location with their counts,
+        keeping those common_words would keep for num.
+
+        Precondition: num > 0
+
+        """
+        words_to_counts = {}
+        count_words_many([self.text_of(row) 
+                          for row in self.location_rows(location)], 
+                         words_to_counts)
+        return dict(top_words(words_to_counts, num))
+
+
+@_profiled('most_popular_many', _ranges_size)
+def most_popular_many(store: TweetStore, 
+                      date_ranges: List[Tuple[int, int]]) -> List[str]:
+    """Return the result of most_popular for each (start_date, end_date) pair
+    in date_ranges, in order. store may also be a dictionary in the format
+    returned by read_tweets.
+
+    All date ranges are answered by one pass over the tweets sorted by date:
+    the running popularity of every user is recorded at the start of each
+    range and subtracted from the running popularity at its end.
+
+    Precondition: end_date >= start_date for every pair in date_ranges
+
+    >>> users = {'user1': [('1', 110, 'bop', 1, 1), ('1', 112, 'bop', 2, 2)],\
+    'user2': [('1', 110, 'bop', 2, 2)]}
+    >>> most_popular_many(users, [(109, 111), (1091, 1111), (100, 200)])
+    ['user2', 'tie', 'user1']
+
+    """
+    if isinstance(store, dict):
+        store = TweetStore.from_dict(store)
+    dates, user_ids, popularity = store.date_sorted()
+
+    # each range starts before its first row and ends after its last row, and
+    # at the same row starts come before ends
+    events = []
+    for i in range(len(date_ranges)):
+        start_date, end_date = date_ranges[i]
+        events.append((bisect_left(dates, start_date), 0, i))
+        events.append((bisect_right(dates, end_date), 1, i))
+    events.sort()
+
+    totals = [0] * len(store.usernames)
+    totals_at_start = {}
+    results = [None] * len(date_ranges)
+    row = 0
+    for position, is_end, i in events:
+        while row < position:
+            totals[user_ids[row]] += popularity[row]
+            row += 1
+        if not is_end:
+            totals_at_start[i] = totals[:]
+        else:
+            before = totals_at_start.pop(i)
+            results[i] = popular_user(dict(zip(
+                store.usernames, 
+                [total - start for total, start in zip(totals, before)])))
+    return results
+
+
+# Popularity index
+
+class PopularityIndex:
+    """For every user, the dates of their tweets in sorted order with the
+    running sum of the popularity (favourite count plus retweet count) of
+    those tweets, so that a user's popularity between any two dates takes two
+    binary searches.
+
+    """
+
+    def __init__(self) -> None:
+        self.users_to_dates = {}
+        # users_to_sums[user][i] is the popularity of the user's first i
+        # tweets in date order
+        self.users_to_sums = {}
+
+    @classmethod
+    def from_dict(cls, users_to_tweets: Dict[str, List[tuple]]) -> \
+        'PopularityIndex':
+        """Return a PopularityIndex of the tweets in users_to_tweets.
+
+        >>> index = PopularityIndex.from_dict({'user1': [('1', 112, 'bop', \
+        2, 2), ('1', 110, 'bop', 1, 1)], 'user2': []})
+        >>> list(index.users_to_dates['user1'])
+        [110, 112]
+        >>> list(index.users_to_sums['user1'])
+        [0, 2, 6]
+
+        """
+        index = cls()
+        for username, tweets in users_to_tweets.items():
+            ordered = sorted(tweets, key=lambda tweet: tweet[TWEET_DATE_INDEX])
+            dates = array('q')
+            sums = array('q', [0])
+            total = 0
+            for tweet in ordered:
+                dates.append(tweet[TWEET_DATE_INDEX])
+                total += tweet[TWEET_FAVOURITE_INDEX] + \
+                    tweet[TWEET_RETWEET_INDEX]
+                sums.append(total)
+            index.users_to_dates[username] = dates
+            index.users_to_sums[username] = sums
+        return index
+
+    def add_user(self, username: str) -> None:
+        """Add username with no tweets if they are not in the index yet."""
+        if username not in self.users_to_dates:
+            self.users_to_dates[username] = array('q')
+            self.users_to_sums[username] = array('q', [0])
+
+    def append(self, username: str, tweet: tuple) -> None:
+        """Add tweet by username to the index. This takes constant time when
+        tweet is no older than username's other tweets.
+
+        >>> index = PopularityIndex()
+        >>> index.append('user1', ('1', 110, 'bop', 1, 1))
+        >>> index.append('user1', ('1', 112, 'bop', 2, 2))
+        >>> index.append('user1', ('1', 111, 'bop', 0, 5))
+        >>> list(index.users_to_sums['user1'])
+        [0, 2, 7, 11]
+
+        """
+        self.add_user(username)
+        dates = self.users_to_dates[username]
+        sums = self.users_to_sums[username]
+        date = tweet[TWEET_DATE_INDEX]
+        popularity = tweet[TWEET_FAVOURITE_INDEX] + tweet[TWEET_RETWEET_INDEX]
+        if len(dates) == 0 or dates[-1] <= date:
+            dates.append(date)
+            sums.append(sums[-1] + popularity)
+        else:
+            # an older tweet shifts the running sums of all newer tweets
+            i = bisect_right(dates, date)
+            dates.insert(i, date)
+            sums.insert(i + 1, sums[i] + popularity)
+            for j in range(i + 2, len(sums)):
+                sums[j] += popularity
+
+    def extend(self, users_to_tweets: Dict[str, List[tuple]]) -> None:
+        """Add all tweets in users_to_tweets to the index."""
+        for username, tweets in users_to_tweets.items():
+            self.add_user(username)
+            for tweet in tweets:
+                self.append(username, tweet)
+
+    def user_popularity(self, username: str, start_date: int, 
+                        end_date: int) -> int:
+        """Return the popularity of username between start_date and end_date
+        (inclusive).
+
+        >>> index = PopularityIndex.from_dict({'user1': [('1', 110, 'bop', \
+        1, 1), ('1', 112, 'bop', 2, 2)]})
+        >>> index.user_popularity('user1', 110, 111)
+        2
+
+        """
+        dates = self.users_to_dates[username]
+        sums = self.users_to_sums[username]
+        return sums[bisect_right(dates, end_date)] - \
+            sums[bisect_left(dates, start_date)]
+
+    def popularity(self, start_date: int, end_date: int) -> Dict[str, int]:
+        """Return the popularity of every user between start_date and end_date
+        (inclusive).
+
+        """
+        return {username: self.user_popularity(username, start_date, end_date)
+                for username in self.users_to_dates}
+
+
+# Hashtag index
+
+class HashtagIndex:
+    """The users who used each hashtag."""
+
+    def __init__(self) -> None:
+        self.usernames = set()
+        self.hashtags_to_users = {}
+
+    @classmethod
+    def from_dict(cls, users_to_tweets: Dict[str, List[tuple]]) -> \
+        'HashtagIndex':
+        """Return a HashtagIndex of the tweets in users_to_tweets, which may
+        also be a tweet collection such as a TweetStore.
+
+        >>> index = HashtagIndex.from_dict({'user1': [('#cat rat#', 1, 'pop', \
+        1, 1)], 'user2': [('#Cat #dog', 1, 'dop', 0, 0)]})
+        >>> sorted(index.hashtags_to_users['cat'])
+        ['user1', 'user2']
+
+        """
+        index = cls()
+        for username, texts in user_texts(users_to_tweets):
+            index.usernames.add(username)
+            for text in texts:
+                index.add_text(username, text)
+        return index
+
+    def add_text(self, username: str, text: str) -> None:
+        """Record the hashtags in text as used by username."""
+        self.usernames.add(username)
+        for hashtag in extract_hashtags(text):
+            if hashtag not in self.hashtags_to_users:
+                self.hashtags_to_users[hashtag] = set()
+            self.hashtags_to_users[hashtag].add(username)
+
+    def add_tweet(self, username: str, tweet: tuple) -> None:
+        """Record the hashtags in tweet as used by username."""
+        self.add_text(username, tweet[TWEET_TEXT_INDEX])
+
+    def users_with(self, hashtag: str) -> set:
+        """Return the users who used hashtag."""
+        return self.hashtags_to_users.get(hashtag, set())
+
+    def detect(self, tweet_text: str) -> str:
+        """Return the only user who used all the hashtags in tweet_text and no
+        other user used any of them, or 'unknown' if there is no such user.
+        This takes time proportional to the number of hashtags in tweet_text.
+
+        >>> index = HashtagIndex.from_dict({'user1': [('#cat rat#', 1, 'pop', \
+        1, 1), ('#dog doggy', 1, 'hop', 0, 0)], 'user2': [('#cat', 1, 'dop', \
+        0, 0)]})
+        >>> index.detect('lol #dog #DOG')
+        'user1'
+        >>> index.detect('lol #dog #cat')
+        'unknown'
+        >>> index.detect('lol')
+        'unknown'
+
+        """
+        author = None
+        for hashtag in extract_hashtags(tweet_text):
+            users = self.users_with(hashtag)
+            if len(users) != 1:
+                return 'unknown'
+            user = next(iter(users))
+            if author is not None and user != author:
+                return 'unknown'
+            author = user
+        if author is None:
+            return 'unknown'
+        return author
+
+
+# the HashtagIndex used by detect_authors in worker processes
+_worker_hashtag_index = None
+
+
+def _init_detect_worker(index: HashtagIndex) -> None:
+    """Set the HashtagIndex used by _detect_chunk in this worker process."""
+    global _worker_hashtag_index
+    _worker_hashtag_index = index
+
+
+def _detect_chunk(texts: List[str]) -> List[str]:
+    """Return the most likely author of each text in texts."""
+    return [_worker_hashtag_index.detect(text) for text in texts]
+
+
+def _chunks(items: Iterable[object], size: int) -> Iterator[list]:
+    """Yield lists of up to size consecutive items from items.
+
+    >>> list(_chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def detect_authors(users_to_tweets: Dict[str, List[tuple]], 
+                   texts: Iterable[str], workers: int = None, 
+                   chunk_size: int = 1000) -> Iterator[str]:
+    """Yield detect_author(users_to_tweets, text) for each text in texts, in
+    order. The hashtags of users_to_tweets (or a HashtagIndex of them) are
+    only collected once, and texts is consumed lazily.
+
+    If workers is given, texts are attributed in chunks of chunk_size by that
+    many worker processes, with a bounded number of chunks in flight.
+
+    >>> users = {'user1': [('#cat rat#', 1, 'pop', 1, 1), ('#dog doggy', 1, \
+    'hop', 0, 0)], 'user2': [('#cat', 1, 'dop', 0, 0)]}
+    >>> list(detect_authors(users, ['lol #dog', 'lol #rat', '#cat']))
+    ['user1', 'unknown', 'unknown']
+
+    """
+    index = users_to_tweets
+    if not isinstance(index, HashtagIndex):
+        index = HashtagIndex.from_dict(users_to_tweets)
+    if workers is None:
+        for text in texts:
+            yield index.detect(text)
+        return
+
+    # imported here since most callers never need a process pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers, initializer=_init_detect_worker,
+                             initargs=(index,)) as executor:
+        pending = deque()
+        for chunk in _chunks(texts, chunk_size):
+            pending.append(executor.submit(_detect_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# Time-bucketed rollups
+
+# the number a YYYYMMDDhhmmss date is divided by to get its bucket, which is
+# YYYYMMDD for a day and YYYYMMDDhh for an hour
+ROLLUP_DIVISORS = {'day': 10 ** 6, 'hour': 10 ** 4}
+
+
+class RollupBucket:
+    """The per-user favourite and retweet sums, hashtag counts and word
+    counts of the tweets in one time bucket. Hashtags are counted once per
+    tweet, as extract_hashtags finds them, and words as count_words does.
+    tweets has the tweets of each user, for answering queries that cover
+    only part of the bucket, and min_date and max_date are the earliest and
+    latest dates of its tweets.
+
+    """
+
+    def __init__(self) -> None:
+        self.num_tweets = 0
+        self.min_date = None
+        self.max_date = None
+        self.favourites = Counter()
+        self.retweets = Counter()
+        self.hashtags = Counter()
+        self.words = Counter()
+        self.tweets = {}
+
+    def add(self, username: str, tweet: tuple) -> None:
+        """Add tweet by username to the aggregates."""
+        tokens = tokenize(tweet[TWEET_TEXT_INDEX])
+        date = tweet[TWEET_DATE_INDEX]
+        if self.num_tweets == 0:
+            self.min_date = self.max_date = date
+        else:
+            self.min_date = min(self.min_date, date)
+            self.max_date = max(self.max_date, date)
+        self.num_tweets += 1
+        self.favourites[username] += tweet[TWEET_FAVOURITE_INDEX]
+        self.retweets[username] += tweet[TWEET_RETWEET_INDEX]
+        self.hashtags.update(dict.fromkeys(tokens.hashtags, 1))
+        self.words.update(tokens.words)
+        if username in self.tweets:
+            self.tweets[username].append(tweet)
+        else:
+            self.tweets[username] = [tweet]
+
+
+class TweetRollup:
+    """Aggregates of tweets by day or by hour, so that queries over a date
+    range combine one RollupBucket per day or hour instead of visiting every
+    tweet. Each tweet's date is decoded into its bucket once, when the tweet
+    is added, and tweets can be added at any time.
+
+    Queries are exact for any range: the buckets whose tweets all fall in the
+    range are combined, and only the tweets of the buckets at either end
+    with tweets outside the range are visited.
+
+    """
+
+    def __init__(self, granularity: str = 'day') -> None:
+        if granularity not in ROLLUP_DIVISORS:
+            raise ValueError('granularity must be one of {}, not {!r}'.format(
+                ', '.join(ROLLUP_DIVISORS), granularity))
+        self.granularity = granularity
+        self._divisor = ROLLUP_DIVISORS[granularity]
+        # every user added, in order, as the keys of a dict
+        self.usernames = {}
+        # the keys of buckets in sorted order
+        self.bucket_keys = []
+        self.buckets = {}
+
+    @classmethod
+    def from_dict(cls, users_to_tweets: Dict[str, List[tuple]], 
+                  granularity: str = 'day') -> 'TweetRollup':
+        """Return a TweetRollup of the tweets in users_to_tweets.
+
+        >>> rollup = TweetRollup.from_dict({'user1': [('#cat', \
+        20181101120000, 'pop', 1, 2), ('#cat hi', 20181102090000, 'pop', \
+        0, 4)], 'user2': []})
+        >>> rollup.bucket_keys
+        [20181101, 20181102]
+        >>> rollup.popularity(20181101000000, 20181101235959)
+        {'user1': 3, 'user2': 0}
+        >>> rollup.hashtag_counts(20181101000000, 20181102235959)
+        {'cat': 2}
+
+        """
+        rollup = cls(granularity)
+        for username, tweets in users_to_tweets.items():
+            rollup.add_user(username)
+            for tweet in tweets:
+                rollup.add_tweet(username, tweet)
+        return rollup
+
+    def bucket_of(self, date: int) -> int:
+        """Return the key of the bucket of date."""
+        return date // self._divisor
+
+    def add_user(self, username: str) -> None:
+        """Add username with no tweets if they are not known yet."""
+        self.usernames[username] = None
+
+    def add_tweet(self, username: str, tweet: tuple) -> None:
+        """Add tweet by username to its bucket."""
+        self.usernames[username] = None
+        key = tweet[TWEET_DATE_INDEX] // self._divisor
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = RollupBucket()
+            self.buckets[key] = bucket
+            if len(self.bucket_keys) == 0 or self.bucket_keys[-1] < key:
+                self.bucket_keys.append(key)
+            else:
+                self.bucket_keys.insert(bisect_left(self.bucket_keys, key), 
+                                        key)
+        bucket.add(username, tweet)
+
+    def add_record(self, username: str, tweet: Optional[tuple]) -> None:
+        """Add a (username, None) or (username, tweet) record as parsed from a
+        tweet file.
+
+        """
+        if tweet is None:
+            self.add_user(username)
+        else:
+            self.add_tweet(username, tweet)
+
+    def buckets_between(self, start_date: int, 
+                        end_date: int) -> List[RollupBucket]:
+        """Return buckets holding exactly the tweets from start_date to
+        end_date (inclusive), in date order. These are the buckets whose
+        tweets are all in the range and, for a bucket with tweets both in and
+        out of the range, a new bucket of its tweets in the range.
+
+        """
+        divisor = self._divisor
+        keys = self.bucket_keys
+        buckets = []
+        for key in keys[bisect_left(keys, start_date // divisor):
+                        bisect_right(keys, end_date // divisor)]:
+            bucket = self.buckets[key]
+            if bucket.max_date < start_date or end_date < bucket.min_date:
+                continue
+            if start_date > bucket.min_date or end_date < bucket.max_date:
+                part = RollupBucket()
+                for username, tweets in bucket.tweets.items():
+                    for tweet in tweets:
+                        if start_date <= tweet[TWEET_DATE_INDEX] <= end_date:
+                            part.add(username, tweet)
+                bucket = part
+            buckets.append(bucket)
+        return buckets
+
+    def user_sums(self, start_date: int, 
+                  end_date: int) -> Dict[str, Tuple[int, int]]:
+        """Return the sums of the favourite counts and of the retweet counts
+        of every user's tweets from start_date to end_date (inclusive).
+
+        """
+        favourites = Counter()
+        retweets = Counter()
+        for bucket in self.buckets_between(start_date, end_date):
+            favourites.update(bucket.favourites)
+            retweets.update(bucket.retweets)
+        return {username: (favourites[username], retweets[username])
+                for username in self.usernames}
+
+    def popularity(self, start_date: int, end_date: int) -> Dict[str, int]:
+        """Return the popularity of every user from start_date to end_date
+        (inclusive), so that most_popular and popularity_leaderboard accept a
+        TweetRollup.
+
+        """
+        return {username: favourites + retweets for username, 
+                (favourites, retweets) in self.user_sums(start_date, 
+                                                         end_date).items()}
+
+    def hashtag_counts(self, start_date: int, 
+                       end_date: int) -> Dict[str, int]:
+        """Return the number of tweets using each hashtag from start_date to
+        end_date (inclusive).
+
+        """
+        counts = Counter()
+        for bucket in self.buckets_between(start_date, end_date):
+            counts.update(bucket.hashtags)
+        return dict(counts)
+
+    def word_counts(self, start_date: int, end_date: int) -> Dict[str, int]:
+        """Return the count of each word from start_date to end_date
+        (inclusive), as count_words would count them.
+
+        """
+        counts = Counter()
+        for bucket in self.buckets_between(start_date, end_date):
+            counts.update(bucket.words)
+        return dict(counts)
+
+    def common_words(self, start_date: int, end_date: int, 
+                     num: int) -> Dict[str, int]:
+        """Return the words and counts common_words would keep for num from
+        the word counts from start_date to end_date (inclusive).
+
+        Precondition: num > 0
+
+        """
+        return dict(top_words(self.word_counts(start_date, end_date), num))
+
+
+# Mention graph
+
+class MentionGraph:
+    """Who mentions whom in a collection of tweets, as a directed graph of
+    usernames with an edge from each author to every account they mention,
+    weighted by the number of mentions.
+
+    Every username has an integer id, its index in names. Edges are stored
+    in compressed sparse row form: the accounts mentioned by id u are
+    out_targets[out_offsets[u]:out_offsets[u + 1]], in id order, with the
+    number of mentions in out_weights at the same positions, and in_offsets,
+    in_sources and in_weights store the reversed edges the same way. For
+    queries over a date range, every single mention is stored in the same
+    form in mention_offsets, mention_dates and mention_targets, sorted by
+    date for each author, and in mentioned_offsets, mentioned_dates and
+    mentioned_sources for each mentioned account. No query reads tweet text.
+
+    """
+
+    def __init__(self) -> None:
+        self.names = []
+        self.ids = {}
+        self.out_offsets = array('Q', [0])
+        self.out_targets = array('I')
+        self.out_weights = array('I')
+        self.in_offsets = array('Q', [0])
+        self.in_sources = array('I')
+        self.in_weights = array('I')
+        self.mention_offsets = array('Q', [0])
+        self.mention_dates = array('q')
+        self.mention_targets = array('I')
+        self.mentioned_offsets = array('Q', [0])
+        self.mentioned_dates = array('q')
+        self.mentioned_sources = array('I')
+
+    @classmethod
+    def from_dict(cls, users_to_tweets: Dict[str, List[tuple]]) -> \
+        'MentionGraph':
+        """Return the MentionGraph of the tweets in users_to_tweets, found
+        with extract_mentions in one pass over the tweets.
+
+        >>> graph = MentionGraph.from_dict({'a': [('@B @b hi @c', 110, \
+        'pop', 0, 0)], 'b': [('@A', 111, 'pop', 0, 0)], 'c': []})
+        >>> graph.names, list(graph.out_targets), list(graph.out_weights)
+        (['a', 'b', 'c'], [1, 2, 0], [2, 1, 1])
+        >>> graph.mentions('a'), graph.mutual_mentions('a')
+        ({'b': 2, 'c': 1}, ['b'])
+
+        """
+        graph = cls()
+        sources = array('I')
+        targets = array('I')
+        dates = array('q')
+        for username, tweets in users_to_tweets.items():
+            source = graph._add_name(username)
+            for tweet in tweets:
+                for mention in extract_mentions(tweet[TWEET_TEXT_INDEX]):
+                    sources.append(source)
+                    targets.append(graph._add_name(mention))
+                    dates.append(tweet[TWEET_DATE_INDEX])
+
+        # sorting by date first keeps every row sorted by date, since the
+        # rows are filled in a stable order
+        order = sorted(range(len(dates)), key=dates.__getitem__)
+        num_names = len(graph.names)
+        graph.mention_offsets, rows = _csr_rows(sources, order, num_names)
+        graph.mention_dates = array('q', [dates[i] for i in rows])
+        graph.mention_targets = array('I', [targets[i] for i in rows])
+        graph.mentioned_offsets, rows = _csr_rows(targets, order, num_names)
+        graph.mentioned_dates = array('q', [dates[i] for i in rows])
+        graph.mentioned_sources = array('I', [sources[i] for i in rows])
+
+        graph.out_offsets, graph.out_targets, graph.out_weights = \
+            _csr_weights(graph.mention_offsets, graph.mention_targets)
+        graph.in_offsets, graph.in_sources, graph.in_weights = \
+            _csr_weights(graph.mentioned_offsets, graph.mentioned_sources)
+        return graph
+
+    def _add_name(self, name: str) -> int:
+        """Return the id of name, adding it if it is new."""
+        node = self.ids.get(name)
+        if node is None:
+            node = len(self.names)
+            self.ids[name] = node
+            self.names.append(name)
+        return node
+
+    def _neighbours(self, offsets: array, nodes: array, weights: array, 
+                    name: str) -> Dict[str, int]:
+        """Return the neighbours of name in the given edge arrays with the
+        weight of each edge.
+
+        """
+        node = self.ids.get(name)
+        if node is None:
+            return {}
+        start, end = offsets[node], offsets[node + 1]
+        return {self.names[nodes[i]]: weights[i] for i in range(start, end)}
+
+    def mentions(self, name: str) -> Dict[str, int]:
+        """Return the accounts name mentioned, with the number of mentions of
+        each.
+
+        """
+        return self._neighbours(self.out_offsets, self.out_targets, 
+                                self.out_weights, name)
+
+    def mentioned_by(self, name: str) -> Dict[str, int]:
+        """Return the accounts that mentioned name, with the number of
+        mentions by each.
+
+        """
+        return self._neighbours(self.in_offsets, self.in_sources, 
+                                self.in_weights, name)
+
+    def out_degree(self, name: str, weighted: bool = False) -> int:
+        """Return the number of accounts name mentioned, or the number of
+        their mentions if weighted is True.
+
+        """
+        node = self.ids.get(name)
+        if node is None:
+            return 0
+        if weighted:
+            return self.mention_offsets[node + 1] - self.mention_offsets[node]
+        return self.out_offsets[node + 1] - self.out_offsets[node]
+
+    def in_degree(self, name: str, weighted: bool = False) -> int:
+        """Return the number of accounts that mentioned name, or the number of
+        mentions of name if weighted is True.
+
+        """
+        node = self.ids.get(name)
+        if node is None:
+            return 0
+        if weighted:
+            return self.mentioned_offsets[node + 1] - \
+                self.mentioned_offsets[node]
+        return self.in_offsets[node + 1] - self.in_offsets[node]
+
+    def _mentions_between(self, node: int, start_date: int, 
+                          end_date: int) -> range:
+        """Return the positions in mention_dates and mention_targets of the
+        mentions by node from start_date to end_date (inclusive).
+
+        """
+        start, end = self.mention_offsets[node], self.mention_offsets[node + 1]
+        return range(bisect_left(self.mention_dates, start_date, start, end),
+                     bisect_right(self.mention_dates, end_date, start, end))
+
+    def top_mentioned(self, num: int, start_date: int = None, 
+                      end_date: int = None) -> List[Tuple[str, int]]:
+        """Return up to num (account, number of mentions) pairs of the most
+        mentioned accounts, from most to fewest mentions and then by name,
+        counting only mentions from start_date to end_date (inclusive) if
+        they are given.
+
+        >>> graph = MentionGraph.from_dict({'a': [('@b @c', 110, 'pop', 0, \
+        0), ('@c', 120, 'pop', 0, 0)]})
+        >>> graph.top_mentioned(1), graph.top_mentioned(2, 100, 115)
+        ([('c', 2)], [('b', 1), ('c', 1)])
+
+        """
+        offsets = self.mentioned_offsets
+        dates = self.mentioned_dates
+        counts = []
+        for node in range(len(self.names)):
+            start, end = offsets[node], offsets[node + 1]
+            if start_date is not None:
+                start = bisect_left(dates, start_date, start, end)
+            if end_date is not None:
+                end = bisect_right(dates, end_date, start, end)
+            if end > start:
+                counts.append((self.names[node], end - start))
+        return heapq.nsmallest(num, counts, key=lambda pair: (-pair[1], 
+                                                             pair[0]))
+
+    def mutual_mentions(self, name: str) -> List[str]:
+        """Return the other accounts that both mentioned and were mentioned by
+        name, in id order.
+
+        """
+        node = self.ids.get(name)
+        if node is None:
+            return []
+        mentioned = set(self.out_targets[self.out_offsets[node]:
+                                         self.out_offsets[node + 1]])
+        return [self.names[source] for source in 
+                self.in_sources[self.in_offsets[node]:
+                                self.in_offsets[node + 1]]
+                if source in mentioned and source != node]
+
+    def ego_network(self, name: str, start_date: int, 
+                    end_date: int) -> Dict[Tuple[str, str], int]:
+        """Return the edges among name and every account name mentioned or
+        was mentioned by from start_date to end_date (inclusive), counting
+        only the mentions in that range, as a dictionary from (author,
+        mentioned account) to the number of mentions.
+
+        >>> graph = MentionGraph.from_dict({'a': [('@b', 110, 'pop', 0, 0)], \
+        'b': [('@c', 111, 'pop', 0, 0), ('@a', 130, 'pop', 0, 0)], \
+        'c': [('@b @d', 112, 'pop', 0, 0)]})
+        >>> graph.ego_network('b', 100, 120)
+        {('b', 'c'): 1, ('a', 'b'): 1, ('c', 'b'): 1}
+
+        """
+        node = self.ids.get(name)
+        if node is None:
+            return {}
+        members = {node}
+        for i in self._mentions_between(node, start_date, end_date):
+            members.add(self.mention_targets[i])
+        start, end = self.mentioned_offsets[node], \
+            self.mentioned_offsets[node + 1]
+        for i in range(bisect_left(self.mentioned_dates, start_date, start, 
+                                   end),
+                       bisect_right(self.mentioned_dates, end_date, start, 
+                                    end)):
+            members.add(self.mentioned_sources[i])
+
+        edges = {}
+        for source in sorted(members, key=lambda member: member != node):
+            for i in self._mentions_between(source, start_date, end_date):
+                target = self.mention_targets[i]
+                if target in members:
+                    edge = (self.names[source], self.names[target])
+                    edges[edge] = edges.get(edge, 0) + 1
+        return edges
+
+
+def _csr_rows(keys: array, order: List[int], 
+              num_rows: int) -> Tuple[array, List[int]]:
+    """Return the row offsets of a compressed sparse row layout with a row
+    for each key from 0 to num_rows - 1, and the positions in keys in the
+    order they fill the rows, taken from order.
+
+    """
+    offsets = array('Q', [0] * (num_rows + 1))
+    for key in keys:
+        offsets[key + 1] += 1
+    for row in range(num_rows):
+        offsets[row + 1] += offsets[row]
+    positions = [0] * len(keys)
+    next_slot = offsets[:-1]
+    for i in order:
+        key = keys[i]
+        positions[next_slot[key]] = i
+        next_slot[key] += 1
+    return offsets, positions
+
+
+def _csr_weights(offsets: array, 
+                 nodes: array) -> Tuple[array, array, array]:
+    """Return the offsets, distinct nodes in increasing order and counts of
+    each row of the compressed sparse rows given by offsets and nodes.
+
+    """
+    weighted_offsets = array('Q', [0])
+    distinct = array('I')
+    weights = array('I')
+    for row in range(len(offsets) - 1):
+        counts = Counter(nodes[offsets[row]:offsets[row + 1]])
+        for node in sorted(counts):
+            distinct.append(node)
+            weights.append(counts[node])
+        weighted_offsets.append(len(distinct))
+    return weighted_offsets, distinct, weights
+
+
+# Cached tweet files
+
+# magic, source size, source mtime in ns, sha256 digest of source
+_CACHE_HEADER = struct.Struct('<8sQq32s')
+_CACHE_COUNT = struct.Struct('<I')
+
+
+def _file_digest(path: str) -> bytes:
+    """Return the sha256 digest of the contents of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+class _HashingReader(io.RawIOBase):
+    """A binary file that reads from file, adding every byte read to digest
+    and counting them in size.
+
+    """
+
+    def __init__(self, file: io.RawIOBase, digest: 'hashlib._Hash') -> None:
+        self._file = file
+        self.digest = digest
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        num_bytes = self._file.readinto(buffer)
+        if num_bytes:
+            self.digest.update(memoryview(buffer)[:num_bytes])
+            self.size += num_bytes
+        return num_bytes
+
+
+def _column_bytes(typecode: str, values: List[int]) -> bytes:
+    """Return values as a little-endian array of typecode."""
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(data: memoryview, pos: int, typecode: str, n: int) -> \
+    Tuple[array, int]:
+    """Return the little-endian array of n typecode values in data at pos
+    and the position after it.
+
+    """
+    column = array(typecode)
+    end = pos + n * column.itemsize
+    column.frombytes(data[pos:end])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, end
+
+
+def write_tweet_cache(users_to_tweets: Dict[str, List[tuple]], 
+                      source_path: str, cache_path: str = None, 
+                      source: Tuple[int, int, bytes] = None) -> None:
+    """Write users_to_tweets, parsed from the file at source_path, to a binary
+    cache file at cache_path (source_path + CACHE_SUFFIX by default).
+
+    source is the size, modification time in ns and sha256 digest of the
+    contents that were parsed. If it is None, they are taken from the file
+    as it is now, which must be what was parsed.
+
+    Each user's tweets are stored as fixed-width columns of dates, favourite
+    counts, retweet counts and source numbers into a table of sources shared
+    by all users, followed by the lengths of the tweet texts and the texts.
+
+    """
+    if cache_path is None:
+        cache_path = source_path + CACHE_SUFFIX
+    if source is None:
+        status = os.stat(source_path)
+        source = (status.st_size, status.st_mtime_ns, 
+                  _file_digest(source_path))
+    parts = [_CACHE_HEADER.pack(CACHE_MAGIC, *source)]
+
+    sources_to_codes = {}
+    user_parts = []
+    for username, tweets in users_to_tweets.items():
+        name = username.encode('utf-8')
+        texts = [tweet[TWEET_TEXT_INDEX].encode('utf-8') for tweet in tweets]
+        codes = []
+        for tweet in tweets:
+            source = tweet[TWEET_SOURCE_INDEX]
+            if source not in sources_to_codes:
+                sources_to_codes[source] = len(sources_to_codes)
+            codes.append(sources_to_codes[source])
+        user_parts += [
+            _CACHE_COUNT.pack(len(name)), name, _CACHE_COUNT.pack(len(tweets)),
+            _column_bytes('q', [tweet[TWEET_DATE_INDEX] for tweet in tweets]),
+            _column_bytes('q', [tweet[TWEET_FAVOURITE_INDEX] 
+                                for tweet in tweets]),
+            _column_bytes('q', [tweet[TWEET_RETWEET_INDEX] 
+                                for tweet in tweets]),
+            _column_bytes('I', codes),
+            _column_bytes('Q', [len(text) for text in texts]),
+            b''.join(texts)]
+
+    parts.append(_CACHE_COUNT.pack(len(sources_to_codes)))
+    for source in sources_to_codes:
+        encoded = source.encode('utf-8')
+        parts += [_CACHE_COUNT.pack(len(encoded)), encoded]
+    parts.append(_CACHE_COUNT.pack(len(users_to_tweets)))
+    parts += user_parts
+
+    # write to a temporary file first so a reader never sees half a cache,
+    # with a unique name so writers running at the same time don't collide
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', 
+                                     dir=os.path.dirname(cache_path) or None)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(b''.join(parts))
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_tweet_cache(source_path: str, cache_path: str = None, 
+                     verify_hash: bool = False) -> \
+    Optional[Dict[str, List[tuple]]]:
+    """Return the tweets cached for the file at source_path in cache_path
+    (source_path + CACHE_SUFFIX by default), or None if there is no cache or
+    it is out of date.
+
+    The cache is out of date if the size of the source file changed, or if
+    its contents hash changed. The hash is only recomputed when the source
+    file's modification time changed, or always if verify_hash is True. If
+    only the modification time changed, the new one is stored in the cache
+    so the next load doesn't hash the file again. A cache that is cut short
+    or otherwise damaged is treated as missing.
+
+    """
+    if cache_path is None:
+        cache_path = source_path + CACHE_SUFFIX
+    try:
+        with open(cache_path, 'rb') as file:
+            data = memoryview(file.read())
+    except OSError:
+        return None
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    magic, size, mtime_ns, digest = _CACHE_HEADER.unpack_from(data)
+    status = os.stat(source_path)
+    if magic != CACHE_MAGIC or size != status.st_size:
+        return None
+    if (verify_hash or mtime_ns != status.st_mtime_ns) and \
+       digest != _file_digest(source_path):
+        return None
+    try:
+        users_to_tweets = _decode_tweet_cache(data)
+    except (struct.error, ValueError, IndexError):
+        # ValueError includes UnicodeDecodeError
+        return None
+    if mtime_ns != status.st_mtime_ns:
+        try:
+            with open(cache_path, 'r+b') as file:
+                file.write(_CACHE_HEADER.pack(magic, size, status.st_mtime_ns,
+                                              digest))
+        except OSError:
+            # the cache is still valid, it just can't be updated
+            pass
+    return users_to_tweets
+
+
+def _decode_tweet_cache(data: memoryview) -> Dict[str, List[tuple]]:
+    """Return the tweets stored in the cache data after its header, raising
+    struct.error, ValueError or IndexError if data is not a complete cache.
+
+    """
+    pos = _CACHE_HEADER.size
+    sources = []
+    (count,) = _CACHE_COUNT.unpack_from(data, pos)
+    pos += _CACHE_COUNT.size
+    for _ in range(count):
+        (length,) = _CACHE_COUNT.unpack_from(data, pos)
+        pos += _CACHE_COUNT.size
+        sources.append(sys.intern(str(data[pos:pos + length], 'utf-8')))
+        pos += length
+
+    users_to_tweets = {}
+    (count,) = _CACHE_COUNT.unpack_from(data, pos)
+    pos += _CACHE_COUNT.size
+    for _ in range(count):
+        (length,) = _CACHE_COUNT.unpack_from(data, pos)
+        pos += _CACHE_COUNT.size
+        username = str(data[pos:pos + length], 'utf-8')
+        pos += length
+        (n,) = _CACHE_COUNT.unpack_from(data, pos)
+        pos += _CACHE_COUNT.size
+        dates, pos = _read_column(data, pos, 'q', n)
+        favourites, pos = _read_column(data, pos, 'q', n)
+        retweets, pos = _read_column(data, pos, 'q', n)
+        codes, pos = _read_column(data, pos, 'I', n)
+        lengths, pos = _read_column(data, pos, 'Q', n)
+        tweets = []
+        for i in range(n):
+            text = str(data[pos:pos + lengths[i]], 'utf-8')
+            pos += lengths[i]
+            tweets.append(Tweet(text, dates[i], sources[codes[i]], 
+                                favourites[i], retweets[i]))
+        users_to_tweets[username] = tweets
+    if pos != len(data):
+        raise ValueError('cache is {} bytes, expected {}'.format(len(data), 
+                                                                 pos))
+    return users_to_tweets
+
+
+@_profiled('read_tweets_cached', _tweets_size)
+def read_tweets_cached(path: str, cache_path: str = None, 
+                       verify_hash: bool = False) -> Dict[str, List[tuple]]:
+    """Return the same dictionary as read_tweets for the file at path, loading
+    it from the cache at cache_path (path + CACHE_SUFFIX by default) when the
+    cache is up to date, and parsing the file and rewriting the cache
+    otherwise.
+
+    """
+    users_to_tweets = load_tweet_cache(path, cache_path, verify_hash)
+    if users_to_tweets is None:
+        # the bytes are hashed as they are parsed, so the cache describes
+        # exactly what was parsed even if the file changes meanwhile
+        with open(path, 'rb', buffering=0) as raw:
+            mtime_ns = os.fstat(raw.fileno()).st_mtime_ns
+            reader = _HashingReader(raw, hashlib.sha256())
+            # decode the same way open(path) does
+            with io.TextIOWrapper(io.BufferedReader(reader)) as file:
+                users_to_tweets = read_tweets(file)
+        write_tweet_cache(users_to_tweets, path, cache_path, 
+                          (reader.size, mtime_ns, reader.digest.digest()))
+    return users_to_tweets
+
+
+# Command-line interface
+
+# fields of the records written by each command
+CLI_FIELDS = {
+    'parse': ['user', 'date', 'source', 'favourites', 'retweets', 'text'],
+    'popular': ['from', 'to', 'user'],
+    'author': ['text', 'author'],
+    'top-words': ['word', 'count'],
+    'hashtags': ['user', 'date', 'hashtag'],
+    'mentions': ['user', 'date', 'mention'],
+}
+
+
+class _RecordWriter:
+    """Writes dictionaries with the given fields to file, one per line, as
+    JSON objects or as CSV rows after a header row.
+
+    """
+
+    def __init__(self, file: TextIO, output_format: str, 
+                 fields: List[str]) -> None:
+        self.fields = fields
+        if output_format == 'csv':
+            # imported here since most callers never write CSV
+            import csv
+            self._csv = csv.writer(file, lineterminator='\n')
+            self._csv.writerow(fields)
+        else:
+            self._csv = None
+        self._file = file
+
+    def write(self, record: Dict[str, object]) -> None:
+        """Write record."""
+        if self._csv is not None:
+            self._csv.writerow([record[field] for field in self.fields])
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def _open_inputs(paths: List[str]) -> Iterator[Tuple[str, TextIO]]:
+    """Yield (path, open file) for each of paths in turn, closing each file
+    before opening the next. A path of '-', or no paths, means stdin.
+
+    """
+    for path in paths or ['-']:
+        if path == '-':
+            yield (path, sys.stdin)
+        else:
+            with open(path) as file:
+                yield (path, file)
+
+
+def _cli_tweets(paths: List[str]) -> Iterator[Tuple[str, tuple]]:
+    """Yield a (username, tweet) pair for every tweet in the files at paths
+    that read_tweets_parallel would keep, reading them in a single forward
+    pass and leaving out duplicates as TweetMerger does.
+
+    """
+    merger = TweetMerger()
+    for path, file in _open_inputs(paths):
+        for username, tweet in iter_tweets(file):
+            if merger.check(username, tweet):
+                yield (username, tweet)
+
+
+def _cli_users_to_tweets(paths: List[str], 
+                         write_cache: bool) -> Dict[str, List[tuple]]:
+    """Return the tweets in the files at paths in the same format as
+    read_tweets_parallel. Files with an up to date cache are loaded from it,
+    and if write_cache is True the caches of the other files are rewritten.
+
+    """
+    merger = TweetMerger()
+    for path in paths or ['-']:
+        if path == '-':
+            file_users = read_tweets(sys.stdin)
+        elif write_cache:
+            file_users = read_tweets_cached(path)
+        else:
+            file_users = load_tweet_cache(path)
+            if file_users is None:
+                with open(path) as file:
+                    file_users = read_tweets(file)
+        merger.update(file_users)
+    return merger.users_to_tweets
+
+
+def _cli_records(args: object) -> Iterator[Dict[str, object]]:
+    """Yield the records to write for the parsed command line args."""
+    if args.command == 'parse':
+        for username, tweet in _cli_tweets(args.files):
+            yield {'user': username, 'date': tweet.date, 
+                   'source': tweet.source, 'favourites': tweet.favourites,
+                   'retweets': tweet.retweets, 'text': tweet.text}
+    elif args.command in ('hashtags', 'mentions'):
+        if args.command == 'hashtags':
+            field, extract = 'hashtag', extract_hashtags
+        else:
+            field, extract = 'mention', extract_mentions
+        for username, tweet in _cli_tweets(args.files):
+            for item in extract(tweet.text):
+                yield {'user': username, 'date': tweet.date, field: item}
+    elif args.command == 'top-words':
+        counter = WordCounter(args.capacity)
+        for username, tweet in _cli_tweets(args.files):
+            counter.update(tweet.text)
+        for word, count in sorted(counter.common_words(args.num).items(),
+                                  key=lambda item: (-item[1], item[0])):
+            yield {'word': word, 'count': count}
+    elif args.command == 'popular':
+        users_to_tweets = _cli_users_to_tweets(args.files, args.cache)
+        yield {'from': args.start, 'to': args.end, 
+               'user': most_popular(users_to_tweets, args.start, args.end)}
+    elif args.command == 'author':
+        users_to_tweets = _cli_users_to_tweets(args.files, args.cache)
+        index = HashtagIndex.from_dict(users_to_tweets)
+        for text in args.text:
+            yield {'text': text, 'author': index.detect(text)}
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the command line argv (sys.argv[1:] by default) and return the
+    exit status. Run with --help for the commands.
+
+    """
+    # imported here so importing tweets stays cheap
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='tweets', description='Analyse tweet files. Each command reads '
+        'the files given, or stdin if there are none, and writes one record '
+        'per line.')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], 
+                        default='jsonl', help='output format')
+    parser.add_argument('-o', '--output', default='-', 
+                        help='file to write to (stdout by default)')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    def add_command(name: str, help: str, cached: bool = False) -> object:
+        command = commands.add_parser(name, help=help)
+        command.add_argument('files', nargs='*', help="tweet files, or '-'")
+        if cached:
+            command.add_argument('--cache', action='store_true', help=
+                                 'write a cache of each file for next time')
+        return command
+
+    add_command('parse', 'write every tweet')
+    popular = add_command('popular', 'write the most popular user in a date '
+                          'range', True)
+    popular.add_argument('--from', dest='start', type=int, required=True,
+                         help='first date, as YYYYMMDDHHMMSS')
+    popular.add_argument('--to', dest='end', type=int, required=True,
+                         help='last date, as YYYYMMDDHHMMSS')
+    author = add_command('author', 'write the likely author of tweet texts',
+                         True)
+    author.add_argument('--text', action='append', required=True, 
+                        help='tweet text, may be repeated')
+    top_words = add_command('top-words', 'write the most common words')
+    top_words.add_argument('-n', dest='num', type=int, default=10,
+                           help='number of words to keep, before ties')
+    top_words.add_argument('--capacity', type=int, default=None, 
+                           help='count at most this many distinct words')
+    add_command('hashtags', 'write the hashtags of every tweet')
+    add_command('mentions', 'write the mentions of every tweet')
+    args = parser.parse_args(argv)
+    if args.command == 'top-words' and args.num <= 0:
+        parser.error('-n must be positive')
+    if args.command == 'top-words' and args.capacity is not None and \
+       args.capacity <= 0:
+        parser.error('--capacity must be positive')
+
+    if args.output == '-':
+        output = sys.stdout
+    else:
+        output = open(args.output, 'w', newline='')
+    try:
+        writer = _RecordWriter(output, args.format, CLI_FIELDS[args.command])
+        for record in _cli_records(args):
+            writer.write(record)
+        output.flush()
+    except BrokenPipeError:
+        # the reader of a pipeline such as "| head" stopped reading
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())